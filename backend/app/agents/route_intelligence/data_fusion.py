@@ -1,29 +1,40 @@
 
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 
 logger = logging.getLogger(__name__)
 
 from google import genai
 
+from .prompt_compaction import compact_intelligence, to_prompt_json
+from ...core.deadline import Deadline
+from ...core.gemini_governor import gemini_governor, Priority, estimate_tokens, DEFAULT_OUTPUT_TOKENS
+from ...utils.llm_json import LLMJSONError, json_generation_config, parse_gemini_response
+
 class DataFusion:
-    def __init__(self, gemini_api_key: str):
+    def __init__(self, gemini_api_key: str, priority: Priority = Priority.STANDARD):
         """
-        Initialize the data fusion engine
+        Initialize the data fusion engine; priority is the Gemini governor lane
         """
         self.gemini_api_key = gemini_api_key
+        self.priority = priority
         self.client = genai.Client(api_key=self.gemini_api_key)
+        # Size of the prompts built by this instance (reported per request)
+        self.prompt_stats = {'prompts': 0, 'data_tokens': 0, 'prompt_tokens': 0, 'dropped_items': 0}
 
     def create_user_prompt(self, combined_insights: Dict) -> str:
         """
-        Create the user prompt for data fusion
+        Create the user prompt for data fusion from compacted, token-budgeted data
         """
-        # Placeholder: Format the data for user prompt
+        data_json, stats = to_prompt_json(compact_intelligence(combined_insights))
+        self.prompt_stats['prompts'] += 1
+        self.prompt_stats['data_tokens'] += stats['tokens']
+        self.prompt_stats['dropped_items'] += stats['dropped_items']
         return f"""Analyze the following multi-source traffic data and generate traffic insights for route planning:
 
 ## INPUT DATA
 ```json
-{combined_insights}
+{data_json}
 ```
 
 ## ANALYSIS INSTRUCTIONS
@@ -198,20 +209,28 @@ Focus on:
 
 Prioritize real-time data (TomTom flow, recent user reports) over historical patterns. Ensure all outputs are actionable for immediate navigation decisions."""
 
-    def fuse_data(self, sources: List[Dict]) -> Dict[str, Any]:
+    async def fuse_group(self, group_id: str, group_data: Dict,
+                         deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """
-        Fuse multiple data sources into a unified output using Gemini model
+        Fuse the sources of a single segment group and return its insight.
+        Uses the async client so groups can be fused concurrently; raises on
+        Gemini or parse failures so the caller can degrade just this group.
         """
-        logger.info("Fusing data from multiple sources using Gemini model.")
-        user_prompt = self.create_user_prompt(sources)
-        system_prompt = self.create_system_prompt()
-        full_prompt = f"{system_prompt}\n\n{user_prompt}"
-        try:
-            response = self.client.models.generate_content(
-                model='gemini-2.5-flash-lite',
-                contents=full_prompt
-            )
-            return {"fused_result": response.text}
-        except Exception as e:
-            logger.error(f"Gemini fusion failed: {e}")
-            return {"error": f"Fusion failed: {str(e)}"}
\ No newline at end of file
+        user_prompt = self.create_user_prompt({group_id: group_data})
+        full_prompt = f"{self.create_system_prompt()}\n\n{user_prompt}"
+        self.prompt_stats['prompt_tokens'] += estimate_tokens(full_prompt)
+        response = await gemini_governor.acall(
+            self.client.aio.models.generate_content,
+            model='gemini-2.5-flash-lite',
+            contents=full_prompt,
+            config=json_generation_config(timeout_seconds=deadline.timeout() if deadline else None),
+            priority=self.priority,
+            estimated_tokens=estimate_tokens(full_prompt) + DEFAULT_OUTPUT_TOKENS,
+            deadline=deadline.expires_at if deadline else None
+        )
+        result = parse_gemini_response(response)
+        insights = result.get('insights') if isinstance(result, dict) else None
+        if not insights:
+            raise LLMJSONError(f"Fusion returned no insight for {group_id}")
+        insight = next((i for i in insights if i.get('group_id') == group_id), insights[0])
+        return {**insight, 'group_id': group_id}
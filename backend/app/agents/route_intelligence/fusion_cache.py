@@ -0,0 +1,80 @@
+"""
+Fusion Cache Module
+Caches Gemini-fused group insights under a fingerprint of the group's inputs.
+The fingerprint is built from the same compact view the fusion prompt uses,
+with the location, speed ratios, delays and report scores quantized and a
+coarse time bucket added, so groups from different requests covering the same
+stretch of road under near-identical conditions share one fusion.
+"""
+
+import hashlib
+import json
+import time
+from typing import Dict, Optional
+
+from .prompt_compaction import compact_tomtom_incident, compact_web_incident, compact_user_report, compact_weather
+from ...core.cache import TTLCache
+
+FUSION_CACHE_TTL_SECONDS = 300
+FUSION_TIME_BUCKET_SECONDS = 300
+FUSION_CACHE_SIZE = 4096
+# ~110m: groups re-centred by slightly different routes still match
+FINGERPRINT_COORDINATE_DECIMALS = 3
+FINGERPRINT_SPEED_RATIO_STEP = 0.05
+FINGERPRINT_SCORE_STEP = 10
+
+fused_insight_cache = TTLCache(max_size=FUSION_CACHE_SIZE, ttl_seconds=FUSION_CACHE_TTL_SECONDS)
+
+
+def _quantize(value: Optional[float], step: float) -> Optional[float]:
+    if value is None:
+        return None
+    return round(round(value / step) * step, 3)
+
+
+def canonical_group_input(group_data: Dict) -> Dict:
+    """Order-independent, quantized view of the inputs fusion decides on"""
+    intelligence = group_data.get('intelligence_data', {})
+    flow = intelligence.get('traffic_flow') or {}
+    web = intelligence.get('web_intelligence') or {}
+
+    incidents = []
+    for incident in intelligence.get('traffic_incidents') or []:
+        compact = compact_tomtom_incident(incident)
+        incidents.append([compact.get('id'), compact.get('category'), compact.get('magnitude'),
+                          round(compact.get('delay_min') or 0)])
+    web_incidents = []
+    for incident in web.get('incidents') or []:
+        if isinstance(incident, dict):
+            compact = compact_web_incident(incident)
+            web_incidents.append([compact.get('type'), compact.get('severity'), compact.get('status'),
+                                  compact.get('title')])
+    reports = []
+    for report in intelligence.get('user_reports') or []:
+        compact = compact_user_report(report)
+        reports.append([compact.get('category'), _quantize(compact.get('score'), FINGERPRINT_SCORE_STEP),
+                        compact.get('text')])
+    weather = compact_weather(intelligence.get('weather_data'))
+
+    return {
+        'center': [round(group_data.get('center_lat', 0), FINGERPRINT_COORDINATE_DECIMALS),
+                   round(group_data.get('center_lng', 0), FINGERPRINT_COORDINATE_DECIMALS)],
+        'flow': [
+            _quantize(flow.get('currentToFreeFlowSpeedRatio'), FINGERPRINT_SPEED_RATIO_STEP),
+            round(flow.get('delayInTravelTimeInMins') or 0),
+            bool(flow.get('roadClosure'))
+        ] if flow else None,
+        'incidents': sorted(incidents, key=str),
+        'web_incidents': sorted(web_incidents, key=str),
+        'user_reports': sorted(reports, key=str),
+        'weather': [weather.get('impact'), weather.get('conditions'), _quantize(weather.get('visibility_km'), 1)],
+        'missing_sources': sorted(group_data.get('missing_sources') or []),
+    }
+
+
+def group_fingerprint(group_data: Dict, now: Optional[float] = None) -> str:
+    """Hash of a group's canonical input and the current FUSION_TIME_BUCKET_SECONDS bucket"""
+    bucket = int((time.time() if now is None else now) // FUSION_TIME_BUCKET_SECONDS)
+    canonical = json.dumps([bucket, canonical_group_input(group_data)],
+                           sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(canonical.encode()).hexdigest()
@@ -0,0 +1,214 @@
+"""
+Incident Tiles Module
+Caches TomTom incidents per fixed map tile so overlapping segment groups and
+concurrent requests on the same corridor share one fetch. A group's bbox is
+answered from the tiles it covers; missing tiles are coalesced into as few
+rectangular bbox calls as possible.
+"""
+
+import asyncio
+import logging
+import math
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from ...core.cache import TTLCache
+
+logger = logging.getLogger("SynapCityLogger")
+
+INCIDENT_TILE_SIZE_DEG = 0.05      # ~5.5km at the equator
+INCIDENT_TILE_TTL_SECONDS = 180
+INCIDENT_TILE_CACHE_SIZE = 20000
+# TomTom rejects bboxes above 10,000 km2; 12x12 tiles stays well below that
+MAX_TILES_PER_CALL_SIDE = 12
+
+Tile = Tuple[int, int]               # (x, y) = (lng index, lat index)
+TileRect = Tuple[int, int, int, int]  # inclusive (x0, y0, x1, y1)
+IncidentFetcher = Callable[[str], Awaitable[List[Dict]]]
+
+
+def tiles_for_bbox(bbox: Dict, tile_size: float = INCIDENT_TILE_SIZE_DEG) -> List[Tile]:
+    """All tiles intersecting a {'sw_lat', 'sw_lng', 'ne_lat', 'ne_lng'} bbox"""
+    x0, x1 = math.floor(bbox['sw_lng'] / tile_size), math.floor(bbox['ne_lng'] / tile_size)
+    y0, y1 = math.floor(bbox['sw_lat'] / tile_size), math.floor(bbox['ne_lat'] / tile_size)
+    return [(x, y) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)]
+
+
+def plan_tile_calls(tiles: Iterable[Tile], max_side: int = MAX_TILES_PER_CALL_SIDE) -> List[TileRect]:
+    """
+    Cover a set of tiles with rectangles: runs of adjacent tiles in each row
+    are merged first, then identical runs in consecutive rows are stacked.
+    Every rectangle contains only requested tiles and spans at most max_side
+    tiles per side.
+    """
+    rows: Dict[int, List[int]] = {}
+    for x, y in set(tiles):
+        rows.setdefault(y, []).append(x)
+
+    runs_by_row: Dict[int, List[Tuple[int, int]]] = {}
+    for y, xs in rows.items():
+        xs.sort()
+        runs = []
+        start = previous = xs[0]
+        for x in xs[1:]:
+            if x != previous + 1 or x - start >= max_side:
+                runs.append((start, previous))
+                start = x
+            previous = x
+        runs.append((start, previous))
+        runs_by_row[y] = runs
+
+    rects = []
+    open_rects: Dict[Tuple[int, int], List[int]] = {}  # (x0, x1) -> [y0, y1]
+    for y in sorted(runs_by_row):
+        still_open = {}
+        for run in runs_by_row[y]:
+            rect = open_rects.pop(run, None)
+            if rect is not None and rect[1] == y - 1 and y - rect[0] < max_side:
+                rect[1] = y
+            else:
+                if rect is not None:
+                    rects.append((run[0], rect[0], run[1], rect[1]))
+                rect = [y, y]
+            still_open[run] = rect
+        for run, rect in open_rects.items():
+            rects.append((run[0], rect[0], run[1], rect[1]))
+        open_rects = still_open
+    for run, rect in open_rects.items():
+        rects.append((run[0], rect[0], run[1], rect[1]))
+    return sorted(rects, key=lambda r: (r[1], r[0]))
+
+
+def incident_bounds(incident: Dict) -> Optional[Tuple[float, float, float, float]]:
+    """(min_lng, min_lat, max_lng, max_lat) of an incident's geometry"""
+    geometry = incident.get('geometry') or {}
+    coordinates = geometry.get('coordinates') or []
+    if geometry.get('type') == 'Point':
+        coordinates = [coordinates]
+    points = [c for c in coordinates if isinstance(c, (list, tuple)) and len(c) >= 2]
+    if not points:
+        return None
+    lngs = [p[0] for p in points]
+    lats = [p[1] for p in points]
+    return min(lngs), min(lats), max(lngs), max(lats)
+
+
+def intersects(bounds: Tuple[float, float, float, float], bbox: Dict) -> bool:
+    min_lng, min_lat, max_lng, max_lat = bounds
+    return not (max_lng < bbox['sw_lng'] or min_lng > bbox['ne_lng'] or
+                max_lat < bbox['sw_lat'] or min_lat > bbox['ne_lat'])
+
+
+class IncidentTileCache:
+    """
+    Process-wide tile cache for TomTom incidents. Tiles being fetched are
+    tracked as futures, so concurrent groups and requests wait for the
+    in-flight call instead of issuing their own. A failed call fails the
+    futures of its tiles, so every waiter sees the error rather than an empty
+    tile.
+    """
+
+    def __init__(self, tile_size: float = INCIDENT_TILE_SIZE_DEG,
+                 ttl_seconds: float = INCIDENT_TILE_TTL_SECONDS,
+                 max_tiles: int = INCIDENT_TILE_CACHE_SIZE):
+        self.tile_size = tile_size
+        self._tiles = TTLCache(max_size=max_tiles, ttl_seconds=ttl_seconds)
+        self._inflight: Dict[Tile, asyncio.Future] = {}
+        self._fetch_tasks: Set[asyncio.Task] = set()
+        self.stats = {'tiles_fetched': 0, 'bbox_calls': 0}
+
+    def tile_bbox(self, rect: TileRect) -> Dict:
+        x0, y0, x1, y1 = rect
+        return {
+            'sw_lng': round(x0 * self.tile_size, 6),
+            'sw_lat': round(y0 * self.tile_size, 6),
+            'ne_lng': round((x1 + 1) * self.tile_size, 6),
+            'ne_lat': round((y1 + 1) * self.tile_size, 6),
+        }
+
+    def prefetch(self, fetch: IncidentFetcher, bboxes: Iterable[Dict]):
+        """
+        Start fetching every missing tile of the given bboxes in one plan, so
+        tiles shared by several groups are coalesced into the same calls.
+        Must be called from the event loop; does not wait for the fetches.
+        """
+        self._prefetch_tiles(fetch, {tile for bbox in bboxes for tile in tiles_for_bbox(bbox, self.tile_size)})
+
+    def _prefetch_tiles(self, fetch: IncidentFetcher, tiles: Iterable[Tile]):
+        missing = [t for t in tiles if t not in self._inflight and t not in self._tiles]
+        if not missing:
+            return
+        loop = asyncio.get_running_loop()
+        for rect in plan_tile_calls(missing):
+            rect_tiles = [(x, y) for y in range(rect[1], rect[3] + 1) for x in range(rect[0], rect[2] + 1)]
+            for tile in rect_tiles:
+                self._inflight[tile] = loop.create_future()
+            task = asyncio.create_task(self._fetch_rect(fetch, rect, rect_tiles))
+            self._fetch_tasks.add(task)
+            task.add_done_callback(self._fetch_tasks.discard)
+
+    async def _fetch_rect(self, fetch: IncidentFetcher, rect: TileRect, rect_tiles: List[Tile]):
+        bbox = self.tile_bbox(rect)
+        bbox_string = f"{bbox['sw_lng']},{bbox['sw_lat']},{bbox['ne_lng']},{bbox['ne_lat']}"
+        per_tile: Dict[Tile, List[Dict]] = {tile: [] for tile in rect_tiles}
+        error: Optional[BaseException] = None
+        fetched = False
+        try:
+            self.stats['bbox_calls'] += 1
+            incidents = await fetch(bbox_string)
+            for incident in incidents:
+                bounds = incident_bounds(incident)
+                if bounds is None:
+                    continue
+                touched = tiles_for_bbox({
+                    'sw_lng': bounds[0], 'sw_lat': bounds[1],
+                    'ne_lng': bounds[2], 'ne_lat': bounds[3]
+                }, self.tile_size)
+                for tile in touched:
+                    if tile in per_tile:
+                        per_tile[tile].append(incident)
+            for tile, tile_incidents in per_tile.items():
+                self._tiles.set(tile, tile_incidents)
+            self.stats['tiles_fetched'] += len(per_tile)
+            fetched = True
+        except Exception as e:
+            logger.error(f"Error fetching TomTom incidents for {bbox_string}: {e}")
+            error = e
+        finally:
+            for tile in rect_tiles:
+                future = self._inflight.pop(tile, None)
+                if future is None or future.done():
+                    continue
+                if fetched:
+                    future.set_result(per_tile[tile])
+                elif error is not None:
+                    future.set_exception(error)
+                    # Mark as retrieved: tiles nobody waits on must not log "never retrieved"
+                    future.exception()
+                else:
+                    future.cancel()
+
+    async def get_incidents(self, fetch: IncidentFetcher, bbox: Dict) -> List[Dict]:
+        """
+        Incidents intersecting bbox, served from cached tiles where possible.
+        Raises the fetch error if any covering tile could not be fetched.
+        """
+        self.prefetch(fetch, [bbox])
+        incidents = {}
+        for tile in tiles_for_bbox(bbox, self.tile_size):
+            tile_incidents = self._tiles.get(tile)
+            if tile_incidents is None:
+                # Expired since the prefetch: fetch it again rather than report no incidents
+                self._prefetch_tiles(fetch, [tile])
+                tile_incidents = await asyncio.shield(self._inflight[tile])
+            for incident in tile_incidents:
+                properties = incident.get('properties', {})
+                key = properties.get('id') or id(incident)
+                if key not in incidents:
+                    bounds = incident_bounds(incident)
+                    if bounds is not None and intersects(bounds, bbox):
+                        incidents[key] = incident
+        return list(incidents.values())
+
+
+# Global incident tile cache shared by all route requests
+incident_tile_cache = IncidentTileCache()
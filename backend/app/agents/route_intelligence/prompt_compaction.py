@@ -0,0 +1,169 @@
+"""
+Prompt Compaction Module
+Reduces collected route intelligence to the fields fusion decisions depend on
+and serializes it as compact JSON under a token budget. Segment instructions,
+raw geometries and TomTom payload noise are dropped, coordinates are rounded,
+and when the budget is still exceeded the least important items are removed
+first. Each fusion prompt carries one group, so incidents are inlined in it.
+"""
+
+import json
+from typing import Dict, List, Optional, Tuple
+
+from ...core.gemini_governor import estimate_tokens
+
+COORDINATE_DECIMALS = 4
+MAX_TEXT_CHARS = 160
+# Budget for the data part of a fusion prompt (the instructions come on top)
+FUSION_DATA_TOKEN_BUDGET = 3000
+
+
+def _text(value: Optional[str], limit: int = MAX_TEXT_CHARS) -> Optional[str]:
+    if not value:
+        return None
+    value = " ".join(str(value).split())
+    return value if len(value) <= limit else value[:limit - 3] + "..."
+
+
+def _drop_empty(item: Dict) -> Dict:
+    return {k: v for k, v in item.items() if v not in (None, "", [], {})}
+
+
+def compact_tomtom_incident(incident: Dict) -> Dict:
+    properties = incident.get('properties', {})
+    events = properties.get('events') or []
+    return _drop_empty({
+        'id': properties.get('id'),
+        'category': properties.get('iconCategory'),
+        'magnitude': properties.get('magnitudeOfDelay'),
+        'delay_min': round((properties.get('delay') or 0) / 60, 1),
+        'description': _text("; ".join(e.get('description', '') for e in events if e.get('description'))),
+        'from': _text(properties.get('from'), 60),
+        'to': _text(properties.get('to'), 60),
+        'start': properties.get('startTime'),
+        'end': properties.get('endTime'),
+        'reports': properties.get('numberOfReports'),
+    })
+
+
+def compact_web_incident(incident: Dict) -> Dict:
+    impact = incident.get('impact') or {}
+    timing = incident.get('timing') or {}
+    source = incident.get('source') or {}
+    return _drop_empty({
+        'type': incident.get('type'),
+        'severity': incident.get('severity'),
+        'title': _text(incident.get('title'), 80),
+        'description': _text(incident.get('description')),
+        'status': impact.get('traffic_status'),
+        'delay_min': impact.get('delay_minutes'),
+        'start': timing.get('start'),
+        'ongoing': timing.get('ongoing'),
+        'source_type': source.get('type'),
+        'reliability': source.get('reliability'),
+    })
+
+
+def compact_user_report(report: Dict) -> Dict:
+    return _drop_empty({
+        'category': report.get('category'),
+        'score': report.get('score'),
+        'text': _text(report.get('content') or report.get('title')),
+        'votes': (report.get('upvotes', 0) or 0) - (report.get('downvotes', 0) or 0),
+        'created_at': report.get('createdAt'),
+    })
+
+
+def compact_weather(weather: Dict) -> Dict:
+    data = (weather or {}).get('traffic_weather_data') or {}
+    return _drop_empty({
+        'impact': data.get('traffic_impact_level'),
+        'conditions': data.get('description') or data.get('weather_condition'),
+        'visibility_km': data.get('visibility_km'),
+        'wind_ms': data.get('wind_speed_ms'),
+        'rain_1h_mm': data.get('rain_1h_mm'),
+    })
+
+
+def compact_group(group_data: Dict) -> Dict:
+    """One group's decision-relevant data, TomTom incidents inlined once each"""
+    intelligence = group_data.get('intelligence_data', {})
+    web = intelligence.get('web_intelligence') or {}
+    incidents = {}
+    for incident in intelligence.get('traffic_incidents') or []:
+        compact = compact_tomtom_incident(incident)
+        incidents.setdefault(compact.pop('id', None) or json.dumps(compact, sort_keys=True), compact)
+    return _drop_empty({
+        'center': [round(group_data.get('center_lat', 0), COORDINATE_DECIMALS),
+                   round(group_data.get('center_lng', 0), COORDINATE_DECIMALS)],
+        'segment_count': len(group_data.get('segments') or []),
+        'flow': intelligence.get('traffic_flow'),
+        'incidents': list(incidents.values()),
+        'web_incidents': [compact_web_incident(i) for i in web.get('incidents') or [] if isinstance(i, dict)],
+        'user_reports': [compact_user_report(r) for r in intelligence.get('user_reports') or []],
+        'weather': compact_weather(intelligence.get('weather_data')),
+        'missing_sources': group_data.get('missing_sources'),
+    })
+
+
+def compact_intelligence(intelligence_data: Dict) -> Dict:
+    """{'groups': {group_id: compact group}}"""
+    return {'groups': {group_id: compact_group(group_data)
+                       for group_id, group_data in intelligence_data.items()}}
+
+
+def _removable_items(payload: Dict) -> List[Tuple[float, str, str, int]]:
+    """(priority, section, group_id, index) for list items that may be dropped, least important first"""
+    items = []
+    for group_id, group in payload.get('groups', {}).items():
+        for index, report in enumerate(group.get('user_reports', [])):
+            items.append((report.get('score', 0) / 100, 'user_reports', group_id, index))
+        for index, incident in enumerate(group.get('web_incidents', [])):
+            items.append((0.5 + (incident.get('reliability') or 0.5) / 2, 'web_incidents', group_id, index))
+    return sorted(items)
+
+
+def to_prompt_json(payload: Dict, token_budget: int = FUSION_DATA_TOKEN_BUDGET) -> Tuple[str, Dict]:
+    """
+    Compact JSON for a prompt plus size stats. Over budget, the lowest
+    priority user reports and web incidents are dropped first, then
+    low-magnitude TomTom incidents; flow and weather are always kept.
+    """
+    text = json.dumps(payload, separators=(',', ':'), default=str)
+    stats = {'tokens': estimate_tokens(text), 'dropped_items': 0}
+    if stats['tokens'] <= token_budget:
+        return text, stats
+
+    payload = json.loads(text)
+    removed = set()
+    for _, section, group_id, index in _removable_items(payload):
+        removed.add((section, group_id, index))
+        stats['dropped_items'] += 1
+        if estimate_tokens(_render(payload, removed)) <= token_budget:
+            break
+    text = _render(payload, removed)
+
+    incidents = [(group['incidents'], incident) for group in payload.get('groups', {}).values()
+                 for incident in group.get('incidents', [])]
+    for group_incidents, incident in sorted(
+            incidents, key=lambda item: (item[1].get('magnitude') or 0, item[1].get('delay_min') or 0)):
+        if estimate_tokens(text) <= token_budget:
+            break
+        group_incidents.remove(incident)
+        stats['dropped_items'] += 1
+        text = _render(payload, removed)
+
+    stats['tokens'] = estimate_tokens(text)
+    return text, stats
+
+
+def _render(payload: Dict, removed: set) -> str:
+    groups = {}
+    for group_id, group in payload.get('groups', {}).items():
+        group = dict(group)
+        for section in ('user_reports', 'web_incidents'):
+            if section in group:
+                group[section] = [item for index, item in enumerate(group[section])
+                                  if (section, group_id, index) not in removed]
+        groups[group_id] = group
+    return json.dumps({**payload, 'groups': groups}, separators=(',', ':'), default=str)
@@ -0,0 +1,77 @@
+"""
+Route Sampling Module
+Decodes Google Directions polylines and resamples them at a fixed spacing so
+route coverage does not depend on how long individual steps are.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from .segment_grouping import EARTH_RADIUS_M
+
+SAMPLE_SPACING_M = 1000  # one sample per km of road
+
+
+@dataclass
+class RouteSamples:
+    """Fixed-spacing points along all unique route segments (parallel arrays)"""
+    lat: np.ndarray
+    lng: np.ndarray
+    segment_index: np.ndarray  # index into unique_segments
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+
+def decode_polyline(encoded: str) -> np.ndarray:
+    """
+    Decode a Google encoded polyline into an (n, 2) array of lat/lng.
+    Chunks are split and summed with numpy instead of a per-character loop.
+    """
+    if not encoded:
+        return np.empty((0, 2))
+    chunks = np.frombuffer(encoded.encode('ascii'), dtype=np.uint8).astype(np.int64) - 63
+    is_last = (chunks & 0x20) == 0
+    # Which value each chunk belongs to, and its 5-bit position inside that value
+    value_index = np.concatenate(([0], np.cumsum(is_last)[:-1]))
+    value_starts = np.flatnonzero(np.concatenate(([True], is_last[:-1])))
+    shifts = 5 * (np.arange(len(chunks)) - value_starts[value_index])
+    values = np.zeros(int(is_last.sum()), dtype=np.int64)
+    np.add.at(values, value_index, (chunks & 0x1f) << shifts)
+    deltas = np.where(values & 1, ~(values >> 1), values >> 1)
+    if len(deltas) % 2:
+        deltas = deltas[:-1]
+    return np.cumsum(deltas.reshape(-1, 2), axis=0) / 1e5
+
+
+def resample_path(points: np.ndarray, spacing_m: float = SAMPLE_SPACING_M) -> np.ndarray:
+    """
+    Resample a path at spacing_m intervals, offset by half a spacing so short
+    paths still get one sample in their middle. Returns an (m, 2) array.
+    """
+    if len(points) < 2:
+        return points
+    lat_rad = np.radians(points[:, 0])
+    lng_rad = np.radians(points[:, 1])
+    a = (np.sin(np.diff(lat_rad) / 2) ** 2 +
+         np.cos(lat_rad[:-1]) * np.cos(lat_rad[1:]) * np.sin(np.diff(lng_rad) / 2) ** 2)
+    step_lengths = EARTH_RADIUS_M * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    along = np.concatenate(([0.0], np.cumsum(step_lengths)))
+    total = along[-1]
+    if total == 0:
+        return points[:1]
+    positions = np.arange(spacing_m / 2, total, spacing_m) if total > spacing_m else np.array([total / 2])
+    return np.column_stack((np.interp(positions, along, points[:, 0]),
+                            np.interp(positions, along, points[:, 1])))
+
+
+def step_path(step: dict) -> np.ndarray:
+    """Decoded polyline of a Directions step, falling back to its start and end"""
+    path = decode_polyline(step.get('polyline', {}).get('points', ''))
+    if len(path) < 2:
+        path = np.array([
+            [step['start_location']['lat'], step['start_location']['lng']],
+            [step['end_location']['lat'], step['end_location']['lng']]
+        ])
+    return path
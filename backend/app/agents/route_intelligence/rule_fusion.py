@@ -0,0 +1,230 @@
+"""
+Rule Fusion Module
+Deterministic local fusion of a segment group's intelligence (TomTom flow and
+incidents, weather, web search, user reports) into the same insight structure
+DataFusion asks Gemini for. It applies the status, recommendation and
+reliability rules spelled out in DataFusion.create_system_prompt, runs in
+well under a millisecond per group, and flags groups whose sources disagree
+so only those need the LLM.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+
+STATUS_LEVELS = ['light', 'moderate', 'heavy', 'blocked']
+LIGHT, MODERATE, HEAVY, BLOCKED = range(4)
+
+# Signals less reliable than this are reported but do not set the status
+MIN_RELIABILITY = 0.5
+# Flow and incident-type sources this many levels apart are treated as conflicting
+CONFLICT_LEVEL_GAP = 2
+MAX_KEY_FACTORS = 3
+MAX_FACTOR_CHARS = 60
+MAX_SUMMARY_CHARS = 100
+
+TOMTOM_INCIDENT_RELIABILITY = 0.9
+# TomTom iconCategory -> incident type
+TOMTOM_CATEGORIES = {
+    1: 'accident', 2: 'fog', 3: 'dangerous_conditions', 4: 'rain', 5: 'ice',
+    6: 'traffic_jam', 7: 'lane_closed', 8: 'road_closed', 9: 'road_works',
+    10: 'wind', 11: 'flooding', 14: 'broken_down_vehicle'
+}
+TOMTOM_SEVERITIES = {0: 'low', 1: 'low', 2: 'medium', 3: 'high', 4: 'critical'}
+WEATHER_LEVELS = {'SEVERE': HEAVY, 'HIGH': MODERATE, 'MODERATE': LIGHT, 'LOW': LIGHT, 'MINIMAL': LIGHT}
+WEB_STATUS_LEVELS = {'blocked': BLOCKED, 'disrupted': MODERATE, 'normal': LIGHT}
+
+
+def _signal(source: str, level: int, reliability: float, delay: float, factor: str) -> Dict:
+    return {
+        'source': source,
+        'level': level,
+        'reliability': reliability,
+        'delay': max(0.0, delay or 0.0),
+        'factor': factor[:MAX_FACTOR_CHARS]
+    }
+
+
+def flow_signal(flow: Dict) -> Optional[Dict]:
+    if not flow:
+        return None
+    ratio = flow.get('currentToFreeFlowSpeedRatio', 1.0)
+    reduction = max(0.0, (1 - ratio) * 100)
+    if flow.get('roadClosure'):
+        level, factor = BLOCKED, "Road closed according to live traffic flow"
+    elif reduction > 50:
+        level, factor = HEAVY, f"Traffic moving {reduction:.0f}% below free flow"
+    elif reduction >= 20:
+        level, factor = MODERATE, f"Traffic moving {reduction:.0f}% below free flow"
+    else:
+        level, factor = LIGHT, "Traffic flowing close to free-flow speed"
+    signal = _signal('tomtom_flow', level, flow.get('confidence', 0.8),
+                     flow.get('delayInTravelTimeInMins', 0), factor)
+    signal['speed_reduction_percent'] = round(reduction)
+    return signal
+
+
+def tomtom_incident_signal(incident: Dict) -> Dict:
+    properties = incident.get('properties', {})
+    category = properties.get('iconCategory', 0)
+    magnitude = properties.get('magnitudeOfDelay', 0)
+    incident_type = TOMTOM_CATEGORIES.get(category, 'incident')
+    if category == 8:
+        level = BLOCKED
+    elif magnitude >= 3 or (category == 1 and magnitude >= 2):
+        level = HEAVY
+    elif magnitude == 2:
+        level = MODERATE
+    else:
+        level = LIGHT
+    events = properties.get('events') or [{}]
+    description = events[0].get('description') or incident_type.replace('_', ' ').capitalize()
+    where = properties.get('from') or properties.get('to')
+    factor = f"{description} near {where}" if where else description
+    signal = _signal('tomtom_incidents', level, TOMTOM_INCIDENT_RELIABILITY,
+                     (properties.get('delay') or 0) / 60, factor)
+    signal['incident'] = {
+        'type': incident_type,
+        'severity': TOMTOM_SEVERITIES.get(magnitude, 'medium'),
+        'description': factor,
+        'estimated_delay': round(signal['delay']),
+        'source': 'tomtom',
+        'reliability': TOMTOM_INCIDENT_RELIABILITY
+    }
+    return signal
+
+
+def web_incident_signal(incident: Dict) -> Dict:
+    impact = incident.get('impact') or {}
+    severity = (incident.get('severity') or 'medium').lower()
+    level = WEB_STATUS_LEVELS.get(impact.get('traffic_status'), LIGHT)
+    if level == MODERATE and severity in ('high', 'critical'):
+        level = HEAVY
+    reliability = (incident.get('source') or {}).get('reliability', 0.6)
+    description = incident.get('description') or incident.get('title') or incident.get('type', 'Reported incident')
+    signal = _signal('web_search', level, reliability, impact.get('delay_minutes', 0), description)
+    signal['incident'] = {
+        'type': incident.get('type', 'incident'),
+        'severity': severity,
+        'description': signal['factor'],
+        'estimated_delay': round(signal['delay']),
+        'source': 'web',
+        'reliability': reliability
+    }
+    return signal
+
+
+def user_report_signal(report: Dict) -> Dict:
+    score = report.get('score', 0)
+    level = HEAVY if score >= 70 else MODERATE if score >= 50 else LIGHT
+    content = report.get('content') or report.get('title') or report.get('category', 'User report')
+    return _signal('user_reports', level, min(1.0, score / 100), 0, f"User report: {content}")
+
+
+def weather_signal(weather: Dict) -> Optional[Dict]:
+    data = (weather or {}).get('traffic_weather_data')
+    if not data:
+        return None
+    impact = data.get('traffic_impact_level', 'MINIMAL')
+    condition = data.get('description') or data.get('weather_condition') or 'clear'
+    signal = _signal('weather', WEATHER_LEVELS.get(impact, LIGHT), 0.8, 0,
+                     f"{condition.capitalize()} ({impact.lower()} traffic impact)")
+    signal['weather_impact'] = {
+        'impact_level': impact.lower(),
+        'conditions': condition,
+        'visibility_km': data.get('visibility_km'),
+        'affecting_traffic': impact in ('MODERATE', 'HIGH', 'SEVERE')
+    }
+    return signal
+
+
+def collect_signals(intelligence: Dict) -> List[Dict]:
+    """One signal per flow reading, incident, report and weather observation"""
+    signals = []
+    flow = flow_signal(intelligence.get('traffic_flow'))
+    if flow:
+        signals.append(flow)
+    signals.extend(tomtom_incident_signal(i) for i in intelligence.get('traffic_incidents') or [])
+    web = intelligence.get('web_intelligence') or {}
+    signals.extend(web_incident_signal(i) for i in web.get('incidents') or [] if isinstance(i, dict))
+    signals.extend(user_report_signal(r) for r in intelligence.get('user_reports') or [])
+    weather = weather_signal(intelligence.get('weather_data'))
+    if weather:
+        signals.append(weather)
+    return signals
+
+
+def sources_conflict(signals: List[Dict]) -> bool:
+    """Live flow and incident-type sources disagree by CONFLICT_LEVEL_GAP levels or more"""
+    reliable = [s for s in signals if s['reliability'] >= MIN_RELIABILITY]
+    flow_levels = [s['level'] for s in reliable if s['source'] == 'tomtom_flow']
+    event_levels = [s['level'] for s in reliable if s['source'] in ('tomtom_incidents', 'web_search', 'user_reports')]
+    if not flow_levels or not event_levels:
+        return False
+    return abs(max(flow_levels) - max(event_levels)) >= CONFLICT_LEVEL_GAP
+
+
+def recommend(level: int, delay: float, incident_count: int) -> str:
+    if level == BLOCKED or delay > 60:
+        return 'avoid'
+    if level == HEAVY or delay >= 30 or incident_count > 1:
+        return 'caution'
+    if level == MODERATE or delay >= 10:
+        return 'proceed'
+    return 'optimal'
+
+
+def fuse_group_rules(group_id: str, group_data: Dict, sources_expected: int = 5) -> Dict:
+    """
+    Insight for one segment group in DataFusion's output format, plus
+    fusion_method='rules' and conflicting_sources.
+    """
+    intelligence = group_data.get('intelligence_data', {})
+    signals = collect_signals(intelligence)
+    reliable = [s for s in signals if s['reliability'] >= MIN_RELIABILITY]
+
+    level = max((s['level'] for s in reliable), default=LIGHT)
+    flow = next((s for s in signals if s['source'] == 'tomtom_flow'), None)
+    incidents = [s['incident'] for s in reliable if 'incident' in s]
+    flow_delay = flow['delay'] if flow else 0.0
+    total_delay = max([flow_delay] + [s['delay'] for s in reliable if 'incident' in s])
+
+    sources_present = {s['source'] for s in signals}
+    coverage = min(1.0, len(sources_present) / sources_expected)
+    mean_reliability = (sum(s['reliability'] for s in signals) / len(signals)) if signals else 0.3
+    confidence = round(mean_reliability * (0.5 + 0.5 * coverage), 2)
+
+    ranked = sorted(reliable, key=lambda s: (s['level'], s['reliability'], s['delay']), reverse=True)
+    key_factors = list(dict.fromkeys(s['factor'] for s in ranked if s['level'] > LIGHT))[:MAX_KEY_FACTORS]
+    if not key_factors and flow:
+        key_factors = [flow['factor']]
+
+    status = STATUS_LEVELS[level]
+    recommendation = recommend(level, total_delay, len(incidents))
+    summary = f"{status.capitalize()} traffic"
+    summary += f": {key_factors[0]}" if key_factors and level > LIGHT else ", no significant incidents"
+
+    weather = next((s for s in signals if s['source'] == 'weather'), None)
+    return {
+        'group_id': group_id,
+        'overall_status': status,
+        'recommendation': recommendation,
+        'confidence_score': confidence,
+        'summary': summary[:MAX_SUMMARY_CHARS],
+        'traffic_analysis': {
+            'speed_reduction_percent': flow['speed_reduction_percent'] if flow else None,
+            'delay_minutes': round(flow_delay),
+            'congestion_level': STATUS_LEVELS[flow['level']] if flow else 'unknown',
+            'flow_confidence': flow['reliability'] if flow else None
+        },
+        'active_incidents': incidents,
+        'weather_impact': weather['weather_impact'] if weather else {
+            'impact_level': 'unknown', 'conditions': 'unknown',
+            'visibility_km': None, 'affecting_traffic': False
+        },
+        'key_factors': key_factors,
+        'alternative_suggestion': "Consider an alternative route" if recommendation in ('avoid', 'caution') else "",
+        'estimated_total_delay': round(total_delay),
+        'last_updated': datetime.now().isoformat() + "Z",
+        'fusion_method': 'rules',
+        'conflicting_sources': sources_conflict(signals)
+    }
@@ -0,0 +1,99 @@
+"""
+Segment Grouping Module
+Groups nearby route points so external lookups (TomTom, weather, web search)
+are made once per area instead of once per route step.
+"""
+
+from collections import defaultdict
+from typing import List
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000
+DEFAULT_GROUP_RADIUS_M = 10000  # 10km
+
+
+def haversine_many(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Vectorized haversine distance (meters) from one point to many points"""
+    lat_rad = np.radians(lat)
+    lats_rad = np.radians(lats)
+    d_lat = lats_rad - lat_rad
+    d_lng = np.radians(lngs - lng)
+    a = np.sin(d_lat / 2) ** 2 + np.cos(lat_rad) * np.cos(lats_rad) * np.sin(d_lng / 2) ** 2
+    return EARTH_RADIUS_M * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def _seed_order(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Visit seeds along the main axis of the point cloud (the travel direction),
+    breaking ties by rounded position so the order never depends on input order.
+    """
+    if len(x) < 2:
+        return np.arange(len(x))
+    points = np.stack([x - x.mean(), y - y.mean()])
+    _, vectors = np.linalg.eigh(np.cov(points))
+    axis = vectors[:, -1]
+    if axis[np.argmax(np.abs(axis))] < 0:
+        axis = -axis
+    along = np.round(axis @ points, 1)
+    return np.lexsort((np.round(y, 1), np.round(x, 1), along))
+
+
+def group_points(lats, lngs, radius_m: float = DEFAULT_GROUP_RADIUS_M) -> List[np.ndarray]:
+    """
+    Group points so every member lies within radius_m of its group's centre point.
+
+    Points are bucketed into a grid of radius_m cells, so each lookup only checks the
+    3x3 neighbouring cells instead of every other point. Seeds are visited in
+    a coordinate-derived order, which makes the groups independent of input order.
+    Returns the member indices of each group, ordered by their first index.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    if len(lats) == 0:
+        return []
+
+    # Equirectangular projection using the latitude farthest from the equator,
+    # so projected east-west offsets never exceed the true distance and no
+    # point within radius_m can fall outside the neighbouring cells.
+    cos_ref = np.cos(np.radians(np.abs(lats).max()))
+    x = np.radians(lngs) * EARTH_RADIUS_M * cos_ref
+    y = np.radians(lats) * EARTH_RADIUS_M
+    cells_x = np.floor(x / radius_m).astype(np.int64)
+    cells_y = np.floor(y / radius_m).astype(np.int64)
+
+    buckets = defaultdict(list)
+    for index, cell in enumerate(zip(cells_x.tolist(), cells_y.tolist())):
+        buckets[cell].append(index)
+    buckets = {cell: np.array(members) for cell, members in buckets.items()}
+
+    def unassigned_within(center: int) -> np.ndarray:
+        center_x, center_y = cells_x[center], cells_y[center]
+        candidates = np.concatenate([
+            buckets[(center_x + dx, center_y + dy)]
+            for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+            if (center_x + dx, center_y + dy) in buckets
+        ])
+        candidates = candidates[~assigned[candidates]]
+        distances = haversine_many(lats[center], lngs[center], lats[candidates], lngs[candidates])
+        return candidates[distances <= radius_m]
+
+    order = _seed_order(x, y)
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+
+    assigned = np.zeros(len(lats), dtype=bool)
+    groups = []
+    for seed in order:
+        if assigned[seed]:
+            continue
+        # Centre the group on the point furthest ahead of the seed (still within
+        # radius_m of it) so the group covers a full radius in both directions.
+        nearby = unassigned_within(seed)
+        center = nearby[np.argmax(rank[nearby])]
+        members = np.sort(unassigned_within(center))
+        assigned[members] = True
+        groups.append(members)
+
+    groups.sort(key=lambda members: members[0])
+    return groups
@@ -3,18 +3,25 @@ import json
 import logging
 import math
 import os
-import re
-import aiohttp
+import numpy as np
 import time
 from .config_keys import config
-from typing import List, Optional, Dict
+from typing import AsyncIterator, List, Optional, Dict
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from .generate_posts import generate_traffic_posts
 from .traffic_analyzer import TrafficAnalyzer, SearchQuery
-from .route_utils import calculate_min_distance_to_route
 from .data_fusion import DataFusion
+from .rule_fusion import fuse_group_rules, recommend, STATUS_LEVELS
+from .fusion_cache import fused_insight_cache, group_fingerprint
+from .segment_grouping import group_points, DEFAULT_GROUP_RADIUS_M
+from .route_sampling import RouteSamples, resample_path, step_path, SAMPLE_SPACING_M
+from .incident_tiles import incident_tile_cache
+from .user_reports import CorridorPosts, corridor_cells, fetch_corridor_posts, score_group_reports
+from ...core.cache import TTLCache
+from ...core.deadline import Deadline
+from ...core.gemini_governor import Priority
+from ...core.geocoding import reverse_geocoder
+from ...core.http_clients import http_clients
 
 # Setup logger
 logger = logging.getLogger("SynapCityLogger")
@@ -24,26 +31,73 @@ console_handler = logging.StreamHandler()
 console_handler.setFormatter(formatter)
 logger.addHandler(console_handler)
 
+# Weather is shared per coarse cell (~28km) and hour across groups and requests
+WEATHER_CELL_DEG = 0.25
+WEATHER_CACHE_TTL_SECONDS = 1800
+weather_cache = TTLCache(max_size=4096, ttl_seconds=WEATHER_CACHE_TTL_SECONDS)
+
+# Flow changes within minutes; points are snapped to a ~110m grid and kept briefly
+FLOW_GRID_DEG = 0.001
+FLOW_CACHE_TTL_SECONDS = 90
+flow_cache = TTLCache(max_size=20000, ttl_seconds=FLOW_CACHE_TTL_SECONDS)
+
+# Directions (and the segments/groups derived from them) per OD pair and 15 minute bucket
+DIRECTIONS_BUCKET_SECONDS = 900
+DIRECTIONS_CACHE_TTL_SECONDS = 900
+directions_cache = TTLCache(max_size=512, ttl_seconds=DIRECTIONS_CACHE_TTL_SECONDS)
+
+# Per-source time budgets within a request deadline; fusion keeps a reserve at the end
+SOURCE_BUDGET_SECONDS = {
+    'traffic_incidents': 6,
+    'weather_data': 5,
+    'traffic_flow': 5,
+    'user_reports': 4,
+    'web_intelligence': 18,
+}
+FUSION_RESERVE_SECONDS = 8
+
+# rules: local rule engine only; hybrid: Gemini only for groups whose sources
+# conflict; llm: Gemini for every group. Rules are the fallback in every mode.
+ROUTE_FUSION_MODE = os.getenv("ROUTE_FUSION_MODE", "hybrid")
+
+
+def incident_active_at(incident: Dict, departure_ts: float) -> bool:
+    """Whether a TomTom incident is still expected at departure (no end time = yes)"""
+    end_time_str = incident.get('properties', {}).get('endTime')
+    if not end_time_str:
+        return True
+    try:
+        end_time = datetime.fromisoformat(end_time_str.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return True
+    return end_time > departure_ts
+
+
+def normalize_place(place: str) -> str:
+    """Case- and whitespace-insensitive form of an origin/destination string"""
+    return " ".join(place.lower().replace(",", ", ").split())
+
+
 class SynapCitySmartTrafficIntelligence:
-    def __init__(self):
+    def __init__(self, priority: Priority = Priority.STANDARD):
         self.config = config
-        # Create persistent HTTP session for better performance
-        self.session = None
-        self.executor = ThreadPoolExecutor(max_workers=10)
+        # Gemini governor lane for fusion and web analysis (background jobs pass BACKGROUND)
+        self.priority = priority
+        # Per-request cache hit/miss counts, reported in the route metadata
+        self.cache_metrics = {
+            'directions': {'hits': 0, 'misses': 0, 'coalesced': 0},
+            'weather': {'hits': 0, 'misses': 0, 'coalesced': 0},
+            'traffic_flow': {'hits': 0, 'misses': 0, 'coalesced': 0},
+            'fusion': {'hits': 0, 'misses': 0, 'coalesced': 0},
+        }
+        self._traffic_analyzer = None
 
     async def __aenter__(self):
-        """Async context manager entry"""
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=10),
-            connector=aiohttp.TCPConnector(limit=50, limit_per_host=20)
-        )
+        """Async context manager entry; HTTP sessions come from the shared registry"""
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit"""
-        if self.session:
-            await self.session.close()
-        self.executor.shutdown(wait=True)
+        """Async context manager exit; pooled sessions stay open for the next request"""
 
     def extract_traffic_affecting_weather(self, weather_data: Dict) -> Dict:
         """Extract essential weather information that affects traffic flow."""
@@ -138,14 +192,16 @@ class SynapCitySmartTrafficIntelligence:
             'key': self.config.google_maps_api_key
         }
     
-        async with self.session.get(url, params=params) as response:
+        async with http_clients.session('google_maps').get(url, params=params) as response:
             response.raise_for_status()
             return await response.json()
 
     def create_route_segments(self, routes: list, departure_time: int) -> Dict:
-        """Optimized route segments creation"""
+        """Unique route steps plus fixed-spacing samples along their polylines"""
         all_segments = []
         seen_midpoints = set()  # Use set for O(1) lookup
+        sample_points = []
+        sample_segments = []
         
         for routeIndex, route in enumerate(routes):
             for stepIndex, step in enumerate(route['legs'][0]['steps']):
@@ -154,6 +210,7 @@ class SynapCitySmartTrafficIntelligence:
                 midpoint_key = (round(midpoint_lat, 6), round(midpoint_lng, 6))  # Round for duplicate detection
                 
                 if midpoint_key not in seen_midpoints:
+                    points = resample_path(step_path(step), SAMPLE_SPACING_M)
                     segment = {
                         "original_route_id": routeIndex,
                         "original_segment_id": stepIndex,
@@ -163,160 +220,151 @@ class SynapCitySmartTrafficIntelligence:
                         "midpoint": {"lat": midpoint_lat, "lng": midpoint_lng},
                         "distance": step["distance"]["value"],
                         "duration": step["duration"]["value"],
-                        "instructions": step["html_instructions"]
+                        "instructions": step["html_instructions"],
+                        "sample_count": len(points)
                     }
+                    sample_points.append(points)
+                    sample_segments.append(np.full(len(points), len(all_segments)))
                     all_segments.append(segment)
                     seen_midpoints.add(midpoint_key)
 
+        points = np.concatenate(sample_points) if sample_points else np.empty((0, 2))
+        samples = RouteSamples(
+            lat=points[:, 0],
+            lng=points[:, 1],
+            segment_index=np.concatenate(sample_segments) if sample_segments else np.empty(0, dtype=int)
+        )
+
         return { 
             "unique_segments": all_segments,
+            "samples": samples,
             "departure_time": departure_time,
             "total_segments": len(all_segments),
             "original_routes": routes,
         }
 
     def nearby_segments_combiner(self, input_data: Dict) -> Dict:
-        """Optimized grouping algorithm"""
+        """
+        Group route samples lying within 10km of a group centre. A long step
+        can span several groups; segment_group_ids lists them in travel order.
+        """
         unique_segments = input_data['unique_segments']
+        samples = input_data['samples']
         departure_time = input_data['departure_time']
         
-        # Pre-calculate for performance
-        R = 6371000  # Earth radius in meters
-        threshold_distance = 10000  # 10km
+        buffer = 0.01
         groups = []
-        processed = [False] * len(unique_segments)  # Use list instead of set for indexing
-
-        def calculate_distance_fast(lat1, lng1, lat2, lng2):
-            """Optimized distance calculation"""
-            d_lat = (lat2 - lat1) * math.pi / 180
-            d_lng = (lng2 - lng1) * math.pi / 180
-            
-            a = (math.sin(d_lat/2) ** 2 +
-                math.cos(lat1 * math.pi / 180) * math.cos(lat2 * math.pi / 180) *
-                math.sin(d_lng/2) ** 2)
-            
-            return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    
-        for index, segment in enumerate(unique_segments):
-            if processed[index]:
-                continue
-                
-            group_segments = [segment]
-            processed[index] = True
-            
-            # Only check unprocessed segments
-            for other_index in range(index + 1, len(unique_segments)):
-                if processed[other_index]:
-                    continue
-                    
-                other_segment = unique_segments[other_index]
-                distance = calculate_distance_fast(
-                    segment['midpoint']['lat'], segment['midpoint']['lng'],
-                    other_segment['midpoint']['lat'], other_segment['midpoint']['lng']
-                )
-                
-                if distance <= threshold_distance:
-                    group_segments.append(other_segment)
-                    processed[other_index] = True
+        sample_group = np.empty(len(samples), dtype=np.int64)
+        
+        for members in group_points(samples.lat, samples.lng, DEFAULT_GROUP_RADIUS_M):
+            group_lats = samples.lat[members]
+            group_lngs = samples.lng[members]
+            sample_group[members] = len(groups)
             
-            # Calculate bounding box efficiently
-            lats = [s['midpoint']['lat'] for s in group_segments]
-            lngs = [s['midpoint']['lng'] for s in group_segments]
-            buffer = 0.01
+            # Use the sample closest to the centroid so point lookups land on the route
+            nearest = np.argmin((group_lats - group_lats.mean()) ** 2 + (group_lngs - group_lngs.mean()) ** 2)
             
             bbox = {
-                'sw_lat': min(lats) - buffer,
-                'sw_lng': min(lngs) - buffer,
-                'ne_lat': max(lats) + buffer,
-                'ne_lng': max(lngs) + buffer
+                'sw_lat': float(group_lats.min()) - buffer,
+                'sw_lng': float(group_lngs.min()) - buffer,
+                'ne_lat': float(group_lats.max()) + buffer,
+                'ne_lng': float(group_lngs.max()) + buffer
             }
             
             group = {
                 'group_id': f'group_{len(groups)}',
-                'segments': group_segments,
-                'center_lat': sum(lats) / len(lats),  # Use average instead of first segment
-                'center_lng': sum(lngs) / len(lngs),
+                'segments': [unique_segments[i] for i in np.unique(samples.segment_index[members]).tolist()],
+                'sample_count': len(members),
+                'center_lat': float(group_lats[nearest]),
+                'center_lng': float(group_lngs[nearest]),
                 'bbox': bbox,
                 'bbox_string': f"{bbox['sw_lng']},{bbox['sw_lat']},{bbox['ne_lng']},{bbox['ne_lat']}"
             }
             
             groups.append(group)
         
+        # Samples are stored segment by segment in travel order
+        segment_group_ids = {}
+        boundaries = np.flatnonzero(np.diff(samples.segment_index)) + 1
+        for indices in np.split(np.arange(len(samples)), boundaries):
+            if len(indices):
+                segment = unique_segments[int(samples.segment_index[indices[0]])]
+                segment_group_ids[segment['segment_key']] = [
+                    groups[g]['group_id'] for g in dict.fromkeys(sample_group[indices].tolist())
+                ]
+        
         return {
             'segment_groups': groups,
+            'segment_group_ids': segment_group_ids,
+            'corridor_cells': corridor_cells(samples.lat, samples.lng),
             'departure_time': departure_time,
             'grouping_stats': {
                 'total_groups': len(groups),
+                'total_samples': len(samples),
                 'average_segments_per_group': round(len(unique_segments) / len(groups)) if groups else 0,
                 'api_calls_needed': len(groups)
             }
         }
 
     async def get_address(self, lat: float, lng: float) -> str:
-        """Async version of address lookup"""
+        """Address of the point, via the shared reverse-geocode cache"""
         if not self.config.google_maps_api_key:
             return "Address not available (API key missing)"
         
-        url = "https://maps.googleapis.com/maps/api/geocode/json"
-        params = {
-            'latlng': f"{lat},{lng}",
-            'key': self.config.google_maps_api_key
-        }
-        
-        try:
-            async with self.session.get(url, params=params) as response:
-                response.raise_for_status()
-                results = (await response.json()).get('results', [])
-                if results:
-                    return results[0].get('formatted_address', 'Address not found')
-                return 'Address not found'
-        except Exception as e:
-            logger.error(f"Error getting address: {e}")
+        result = await reverse_geocoder.reverse_geocode(lat, lng, self.config.google_maps_api_key)
+        if result is None:
             return f"Location: {lat:.4f}, {lng:.4f}"
+        return result.get('formatted_address', 'Address not found')
 
-    async def get_tomtom_incidents(self, group_bbox_string: str, departure_time: int) -> List:
-        """Async TomTom incidents"""
-        if not self.config.tomtom_api_key:
-            logger.warning("TomTom API key not configured")
-            return []
-
+    async def fetch_tomtom_incidents(self, bbox_string: str) -> List:
+        """Raw TomTom incidents (with geometry) for one bbox call"""
         url = "https://api.tomtom.com/traffic/services/5/incidentDetails"
         params = {
             'key': self.config.tomtom_api_key,
-            "bbox": group_bbox_string,
-            "fields": "{incidents{type,properties{iconCategory,magnitudeOfDelay,events{description,code},startTime,endTime,from,to,length,delay,numberOfReports,lastReportTime}}}",
+            "bbox": bbox_string,
+            "fields": "{incidents{type,geometry{type,coordinates},properties{id,iconCategory,magnitudeOfDelay,events{description,code},startTime,endTime,from,to,length,delay,numberOfReports,lastReportTime}}}",
         }
         
-        try:
-            async with self.session.get(url, params=params) as response:
-                if response.status != 200:
-                    logger.error(f"TomTom API error: {response.status}")
-                    return []
-                
-                data = await response.json()
-                incidents_with_impact = []
-                
-                for incident in data.get('incidents', []):
-                    end_time_str = incident.get('properties', {}).get('endTime')
-                    if end_time_str:
-                        end_time = datetime.strptime(end_time_str, "%Y-%m-%dT%H:%M:%SZ").timestamp()
-                        if end_time > departure_time:
-                            incidents_with_impact.append(incident)
-                    else:
-                        incidents_with_impact.append(incident)
-
-                return incidents_with_impact
-                
-        except Exception as e:
-            logger.error(f"Error fetching TomTom incidents: {e}")
+        async with http_clients.session('tomtom').get(url, params=params) as response:
+            if response.status != 200:
+                raise RuntimeError(f"TomTom API error: {response.status}")
+            return (await response.json()).get('incidents', [])
+
+    async def get_tomtom_incidents(self, group_bbox: Dict, departure_time: int) -> List:
+        """TomTom incidents for a group bbox, served from the shared incident tile cache"""
+        if not self.config.tomtom_api_key:
+            logger.warning("TomTom API key not configured")
             return []
 
+        # Fetch errors propagate so the group records traffic_incidents as missing
+        incidents = await incident_tile_cache.get_incidents(self.fetch_tomtom_incidents, group_bbox)
+        return [incident for incident in incidents if incident_active_at(incident, departure_time // 1000)]
+
     async def get_weather_data(self, lat: float, lng: float, dt: int) -> Dict:
-        """Async weather data"""
+        """
+        Weather for the coarse cell and hour containing (lat, lng, dt). All
+        groups and requests in the same cell and hour share one cached fetch.
+        """
         if not self.config.openweather_api_key:
             logger.warning("OpenWeather API key not configured")
             return {}
-            
+        
+        cell_lat = math.floor(lat / WEATHER_CELL_DEG)
+        cell_lng = math.floor(lng / WEATHER_CELL_DEG)
+        hour_bucket = dt // 3600
+        return await weather_cache.get_or_fetch(
+            (cell_lat, cell_lng, hour_bucket),
+            lambda: self.fetch_weather_data(
+                round((cell_lat + 0.5) * WEATHER_CELL_DEG, 4),
+                round((cell_lng + 0.5) * WEATHER_CELL_DEG, 4),
+                hour_bucket * 3600
+            ),
+            should_cache=bool,
+            metrics=self.cache_metrics['weather']
+        )
+
+    async def fetch_weather_data(self, lat: float, lng: float, dt: int) -> Dict:
+        """Async weather data"""
         url = "https://api.openweathermap.org/data/3.0/onecall/timemachine"
         params = {
             'lat': lat,
@@ -327,7 +375,7 @@ class SynapCitySmartTrafficIntelligence:
         }
         
         try:
-            async with self.session.get(url, params=params) as response:
+            async with http_clients.session('openweather').get(url, params=params) as response:
                 response.raise_for_status()
                 data = await response.json()
                 result = self.extract_traffic_affecting_weather(data)
@@ -338,10 +386,24 @@ class SynapCitySmartTrafficIntelligence:
             return {}
 
     async def get_tomtom_flow_data(self, lat: float, lng: float) -> Dict:
-        """Async TomTom flow data"""
+        """
+        TomTom flow at (lat, lng) snapped to a fine grid, cached briefly and
+        fetched once for all concurrent callers of the same grid point.
+        """
         if not self.config.tomtom_api_key:
             return {}
-            
+        
+        snapped_lat = round(round(lat / FLOW_GRID_DEG) * FLOW_GRID_DEG, 6)
+        snapped_lng = round(round(lng / FLOW_GRID_DEG) * FLOW_GRID_DEG, 6)
+        return await flow_cache.get_or_fetch(
+            (snapped_lat, snapped_lng),
+            lambda: self.fetch_tomtom_flow_data(snapped_lat, snapped_lng),
+            should_cache=bool,
+            metrics=self.cache_metrics['traffic_flow']
+        )
+
+    async def fetch_tomtom_flow_data(self, lat: float, lng: float) -> Dict:
+        """Async TomTom flow data"""
         url = "https://api.tomtom.com/traffic/services/4/flowSegmentData/absolute/10/json"
         params = {
             'point': f"{lat},{lng}",
@@ -349,7 +411,7 @@ class SynapCitySmartTrafficIntelligence:
         }
         
         try:
-            async with self.session.get(url, params=params) as response:
+            async with http_clients.session('tomtom').get(url, params=params) as response:
                 response.raise_for_status()
                 flow_segment = (await response.json())['flowSegmentData']
                 return {
@@ -362,111 +424,103 @@ class SynapCitySmartTrafficIntelligence:
             logger.error(f"Error fetching TomTom flow data: {e}")
             return {}
 
-    def get_user_reports(self, group: Dict, user_reports: List, departure_time: int) -> List:
-        """Optimized user reports processing"""
-        final_reports = []
-        type_score = {
-            'accident': 10, 'construction': 8, 'weather': 7,
-            'traffic_jam': 6, 'event': 5, 'resolved': 2
-        }
-        
-        # Pre-calculate group bounds for faster filtering
-        bbox = group['bbox']
-        
-        for post in user_reports:
-            report_type = post['category']
-            if report_type == "resolved":
-                continue
-                
-            # Quick bounding box check first
-            lat, lng = post['location']['latitude'], post['location']['longitude']
-            if not (bbox['sw_lat'] <= lat <= bbox['ne_lat'] and bbox['sw_lng'] <= lng <= bbox['ne_lng']):
-                continue
-            
-            # Age calculation
-            report_age = departure_time - datetime.strptime(post['createdAt'], "%Y-%m-%dT%H:%M:%S.%fZ").timestamp()
-            age_in_hours = report_age / 3600  # Fixed division
-            
-            # Age filtering
-            age_thresholds = {
-                "accident": 4, "weather": 4, "construction": 24,
-                "traffic_jam": 2, "event": 5
-            }
-            
-            if age_in_hours > age_thresholds.get(report_type, 24):
-                continue
-            
-            # Score calculation (simplified)
-            score = max(0, 20 - (age_in_hours * 5))  # Time score
-            min_distance = calculate_min_distance_to_route(post['location'], group['center_lat'], group['center_lng'])
-            score += max(0, 40 - (min_distance/25))  # Distance score
-            score += min(20, max(0, 20 + (post.get('upvotes', 0) - post.get('downvotes', 0))))  # Vote score
-            score += type_score.get(report_type, 0)  # Type score
-            
-            if score > 30:  # Only include high-scoring reports
-                final_reports.append({**post, "group_id": group['group_id'], "score": round(score)})
-
-        return final_reports
+    async def get_user_reports(self, group: Dict, corridor_posts: asyncio.Future, departure_time: int) -> List:
+        """Community reports near one group, scored from the route's corridor posts"""
+        corridor: CorridorPosts = await asyncio.shield(corridor_posts)
+        return score_group_reports(corridor, group, departure_time // 1000)
 
-    async def get_web_search_intelligence(self, group: Dict, departure_time: str) -> Dict:
-        """Async web search intelligence"""
-        try:
-            analyzer = TrafficAnalyzer(
+    def get_traffic_analyzer(self) -> TrafficAnalyzer:
+        if self._traffic_analyzer is None:
+            self._traffic_analyzer = TrafficAnalyzer(
                 gemini_api_key=self.config.gemini_api_key,
                 search_api_key=self.config.google_search_api_key,
-                search_engine_id=self.config.search_engine_id
-            )
-            
-            address = await self.get_address(group['center_lat'], group['center_lng'])
-            query = SearchQuery(
-                address=address,
-                current_time=datetime.now().isoformat(),
-                departure_time=departure_time
+                search_engine_id=self.config.search_engine_id,
+                priority=self.priority
             )
+        return self._traffic_analyzer
+
+    async def get_group_web_sources(self, groups: List[Dict], departure_time: str) -> Dict:
+        """
+        Web search for all groups of a route at once: unique queries are issued
+        once and their verified results split between the groups they concern.
+        Returns {group_id: (SearchQuery, verified_results)}.
+        """
+        addresses = await asyncio.gather(*(
+            self.get_address(group['center_lat'], group['center_lng']) for group in groups
+        ))
+        current_time = datetime.now().isoformat()
+        group_addresses = {group['group_id']: address for group, address in zip(groups, addresses)}
+        sources = await self.get_traffic_analyzer().web_searcher.search_for_groups(
+            group_addresses, current_time, departure_time
+        )
+        return {
+            group_id: (SearchQuery(address=address, current_time=current_time, departure_time=departure_time),
+                       sources[group_id])
+            for group_id, address in group_addresses.items()
+        }
 
-            result = await analyzer.search_and_analyze(query)
-            return result
+    async def get_web_search_intelligence(self, group_id: int, web_sources: asyncio.Future,
+                                          deadline: Optional[Deadline] = None) -> Dict:
+        """Gemini analysis of the web sources relevant to one group"""
+        try:
+            query, verified_results = (await asyncio.shield(web_sources))[group_id]
+            return await self.get_traffic_analyzer().analyze_sources(query, verified_results, deadline)
         except Exception as e:
             logger.error(f"Error in web search intelligence: {e}")
             return {"error": str(e), "incidents": []}
 
-    async def collect_intelligence_group(self, group: Dict, departure_time: int, readable_time: str, 
-                                       get_flow_data: bool, traffic_incident_posts: List) -> tuple:
-        """Collect intelligence for a single group - fully async"""
+    async def collect_intelligence_group(self, group: Dict, departure_time: int, web_sources: asyncio.Future,
+                                       get_flow_data: bool, corridor_posts: asyncio.Future,
+                                       deadline: Optional[Deadline] = None) -> tuple:
+        """
+        Collect intelligence for a single group - fully async. With a deadline,
+        each source gets its own budget within it; sources that time out or
+        fail are left empty and listed in missing_sources.
+        """
         group_id = group['group_id']
         
         # Create all async tasks
         tasks = {}
         
         # TomTom Incidents
-        tasks['traffic_incidents'] = self.get_tomtom_incidents(group['bbox_string'], departure_time)
+        tasks['traffic_incidents'] = self.get_tomtom_incidents(group['bbox'], departure_time)
         
         # Weather Data  
         tasks['weather_data'] = self.get_weather_data(group['center_lat'], group['center_lng'], departure_time // 1000)
         
         # Web Search Intelligence
-        tasks['web_intelligence'] = self.get_web_search_intelligence(group, readable_time)
+        tasks['web_intelligence'] = self.get_web_search_intelligence(group_id, web_sources, deadline)
         
         # TomTom Flow Data (conditional)
         if get_flow_data:
             tasks['traffic_flow'] = self.get_tomtom_flow_data(group['center_lat'], group['center_lng'])
         
+        # Community reports from the corridor posts fetched once per route
+        tasks['user_reports'] = self.get_user_reports(group, corridor_posts, departure_time)
+        
         # Execute all async tasks concurrently
+        if deadline is not None:
+            tasks = {
+                task_name: asyncio.wait_for(task, deadline.timeout(SOURCE_BUDGET_SECONDS.get(task_name)))
+                for task_name, task in tasks.items()
+            }
         results = await asyncio.gather(*tasks.values(), return_exceptions=True)
         
         # Map results back to task names
         task_results = {}
+        missing_sources = []
         for i, (task_name, _) in enumerate(tasks.items()):
             result = results[i]
             if isinstance(result, Exception):
-                logger.error(f"Error in {task_name} for group {group_id}: {result}")
-                task_results[task_name] = {} if task_name != 'traffic_incidents' else []
+                if isinstance(result, asyncio.TimeoutError):
+                    logger.warning(f"{task_name} for group {group_id} ran out of time budget")
+                else:
+                    logger.error(f"Error in {task_name} for group {group_id}: {result}")
+                task_results[task_name] = [] if task_name in ('traffic_incidents', 'user_reports') else {}
+                missing_sources.append(task_name)
             else:
                 task_results[task_name] = result
         
-        # User Reports (synchronous, but fast)
-        task_results['user_reports'] = self.get_user_reports(group, traffic_incident_posts, departure_time)
-        
         return group_id, {
             'bbox': group['bbox'],
             'bbox_string': group['bbox_string'],
@@ -474,127 +528,434 @@ class SynapCitySmartTrafficIntelligence:
             'center_lng': group['center_lng'],
             'segments': group['segments'],
             'departure_time': departure_time,
-            'intelligence_data': task_results
+            'intelligence_data': task_results,
+            'missing_sources': missing_sources
         }
 
-    async def collect_intelligence(self, combined_segments: Dict) -> Dict:
-        """Optimized intelligence collection with full concurrency"""
+    async def iter_intelligence(self, combined_segments: Dict, deadline: Optional[Deadline] = None,
+                                corridor_posts: Optional[asyncio.Future] = None) -> AsyncIterator[tuple]:
+        """
+        Collect intelligence for all groups concurrently, yielding (group_id, data)
+        as each group completes. Collection stops FUSION_RESERVE_SECONDS before
+        the deadline so fusion still has time to run on what arrived.
+        A caller that also needs the corridor posts passes its own
+        fetch_corridor_posts future, which is then left running for it.
+        """
+        collection_deadline = deadline.reserve(FUSION_RESERVE_SECONDS) if deadline else None
         departure_time = combined_segments['departure_time']
         readable_time = datetime.fromtimestamp(departure_time//1000).strftime('%Y-%m-%d %H:%M:%S')
         current_time = time.time()
         get_flow_data = (departure_time//1000) - current_time < 7200
         
-        # Generate traffic posts once
-        traffic_incident_posts = generate_traffic_posts()
+        # Recent community posts along the whole corridor, fetched once
+        owns_corridor_posts = corridor_posts is None
+        if owns_corridor_posts:
+            corridor_posts = asyncio.ensure_future(fetch_corridor_posts(combined_segments['corridor_cells']))
+        
+        # Plan incident tile fetches for all groups at once so shared tiles are coalesced
+        if self.config.tomtom_api_key:
+            incident_tile_cache.prefetch(
+                self.fetch_tomtom_incidents,
+                [group['bbox'] for group in combined_segments['segment_groups']]
+            )
+        
+        # Web searches are planned across all groups; each group awaits its share
+        web_sources = asyncio.ensure_future(
+            self.get_group_web_sources(combined_segments['segment_groups'], readable_time)
+        )
         
         # Create tasks for all groups concurrently
         group_tasks = [
             self.collect_intelligence_group(
-                group, departure_time, readable_time, 
-                get_flow_data, traffic_incident_posts
+                group, departure_time, web_sources,
+                get_flow_data, corridor_posts, collection_deadline
             )
             for group in combined_segments['segment_groups']
         ]
         
         # Execute all group intelligence collection concurrently
-        results = await asyncio.gather(*group_tasks)
-        
-        # Build final result
+        group_tasks = [asyncio.ensure_future(task) for task in group_tasks]
+        try:
+            for completed in asyncio.as_completed(group_tasks):
+                yield await completed
+        finally:
+            web_sources.cancel()
+            if owns_corridor_posts:
+                corridor_posts.cancel()
+            for task in group_tasks:
+                task.cancel()
+
+    async def collect_intelligence(self, combined_segments: Dict, deadline: Optional[Deadline] = None,
+                                   corridor_posts: Optional[asyncio.Future] = None) -> Dict:
+        """Optimized intelligence collection with full concurrency"""
         fused_intelligence = {}
-        for group_id, group_data in results:
+        async for group_id, group_data in self.iter_intelligence(combined_segments, deadline, corridor_posts):
             fused_intelligence[group_id] = group_data
-            
-        return fused_intelligence
+        return self.order_by_group(fused_intelligence, combined_segments)
+
+    def order_by_group(self, intelligence_data: Dict, combined_segments: Dict) -> Dict:
+        """Per-group results in segment group order (they arrive in completion order)"""
+        return {
+            group['group_id']: intelligence_data[group['group_id']]
+            for group in combined_segments['segment_groups']
+            if group['group_id'] in intelligence_data
+        }
 
-    def data_fusion(self, intelligence_data: Dict, routes: Dict, segment_groups, segments) -> Dict:
-        """Optimized data fusion"""
+    async def fuse_group(self, fuser: DataFusion, group_id: str, group_data: Dict,
+                         deadline: Optional[Deadline] = None) -> Optional[Dict]:
+        """
+        Fused insight for one group. The rule engine answers directly unless
+        ROUTE_FUSION_MODE asks for Gemini; if Gemini fails, is rate-limited or
+        runs out of time the rule-based insight is used instead. None only if
+        both fail. Gemini insights are cached under the group's input
+        fingerprint, so a repeat corridor with the same conditions skips fusion.
+        Only in-flight fusions are shared per governor lane, so a live request
+        never waits on one queued in the BACKGROUND lane; finished insights
+        answer every lane.
+        """
         try:
-            fuser = DataFusion(gemini_api_key=self.config.gemini_api_key)
-            insights_data = fuser.fuse_data(intelligence_data)["fused_result"]
-            
-            # Extract JSON more efficiently
-            if isinstance(insights_data, str):
-                json_match = re.search(r'\{.*\}', insights_data, re.DOTALL)
-                if json_match:
-                    insights_data = json.loads(json_match.group())
-                else:
-                    logger.error("No JSON found in fusion result")
-                    return routes
-            
-            insights = insights_data.get('insights', [])
-            
-            # Create efficient mappings
-            group_insights = {insight['group_id']: insight for insight in insights}
-            segment_to_group = {}
-            
-            for group in segment_groups:
-                group_id = group['group_id']
-                for segment in group.get('segments', []):
-                    segment_key = segment.get('segment_key')
-                    if segment_key:
-                        segment_to_group[segment_key] = group_id
-            
-            # Get unique route IDs
-            route_ids = list(set(seg['original_route_id'] for seg in segments))
-            
-            # Build route insights efficiently
-            route_insights = {}
-            for route_id in route_ids:
-                route_segments = [seg for seg in segments if seg['original_route_id'] == route_id]
-                route_segments.sort(key=lambda x: x['original_segment_id'])
-                
-                seen_groups = set()
-                route_group_insights = []
-                
-                for segment in route_segments:
-                    group_id = segment_to_group.get(segment['segment_key'])
-                    if group_id and group_id in group_insights and group_id not in seen_groups:
-                        route_group_insights.append(group_insights[group_id])
-                        seen_groups.add(group_id)
-                
-                route_insights[f"route_{route_id}"] = {
-                    'route_id': route_id,
-                    'insights': route_group_insights,
-                    'last_updated': datetime.now().isoformat()
-                }
-            
-            # Add insights to routes
-            routes['insights'] = [route_insights.get(f"route_{i}", {}) for i in range(len(routes['routes']))]
-            
-            return routes
-            
+            rules_insight = fuse_group_rules(group_id, group_data)
         except Exception as e:
-            logger.error(f"Error in data fusion: {e}")
-            return routes
+            logger.error(f"Error in rule fusion for {group_id}: {e}")
+            rules_insight = None
+        if rules_insight is not None and (
+                ROUTE_FUSION_MODE == 'rules' or
+                (ROUTE_FUSION_MODE == 'hybrid' and not rules_insight['conflicting_sources'])):
+            return rules_insight
 
-    async def get_per_route_insights(self, origin: str, destination: str, departure_time: int) -> Dict:
-        """Main optimized method with full async support"""
+        fingerprint = group_fingerprint(group_data)
         try:
-            # Step 1: Get routes (async)
-            routes = await self.get_multiple_routes(origin, destination, departure_time)
-            
-            # Step 2: Create route segments (fast, synchronous)
-            route_segments = self.create_route_segments(routes['routes'], departure_time)
-            
-            # Step 3: Combine nearby segments (fast, synchronous)
-            combined_segments = self.nearby_segments_combiner(route_segments)
-            
-            # Step 4: Collect intelligence (fully async, concurrent)
-            intelligence_data = await self.collect_intelligence(combined_segments)
-            
-            # Step 5: Data fusion (synchronous)
-            routes_with_insights = self.data_fusion(
-                intelligence_data, routes, 
-                combined_segments['segment_groups'], 
-                route_segments['unique_segments']
+            insight = await asyncio.wait_for(
+                fused_insight_cache.get_or_fetch(
+                    fingerprint,
+                    lambda: fuser.fuse_group(group_id, group_data, deadline),
+                    metrics=self.cache_metrics['fusion'],
+                    flight_key=(fingerprint, self.priority)
+                ),
+                deadline.timeout() if deadline else None
             )
-            
-            return routes_with_insights
-            
+            return {**insight, 'group_id': group_id, 'fusion_method': 'llm'}
+        except asyncio.TimeoutError:
+            logger.warning(f"Fusion for {group_id} ran out of time budget")
+        except Exception as e:
+            logger.error(f"Error in data fusion for {group_id}: {e}")
+        if rules_insight is not None:
+            return {**rules_insight, 'fusion_method': 'rules_fallback'}
+        return None
+
+    async def data_fusion(self, intelligence_data: Dict, routes: Dict, segment_group_ids: Dict, segments,
+                          deadline: Optional[Deadline] = None) -> Dict:
+        """Fuse every group concurrently, then merge the group insights per route"""
+        fuser = DataFusion(gemini_api_key=self.config.gemini_api_key, priority=self.priority)
+        insights = await asyncio.gather(*(
+            self.fuse_group(fuser, group_id, group_data, deadline)
+            for group_id, group_data in intelligence_data.items()
+        ))
+        group_insights = {
+            group_id: insight for group_id, insight in zip(intelligence_data, insights) if insight is not None
+        }
+        return self.merge_route_insights(group_insights, routes, segment_group_ids, segments)
+
+    def route_group_ids(self, segment_group_ids: Dict, segments) -> Dict[int, List[str]]:
+        """Segment group ids each route passes through, in travel order"""
+        route_groups = {}
+        for segment in sorted(segments, key=lambda x: (x['original_route_id'], x['original_segment_id'])):
+            group_ids = route_groups.setdefault(segment['original_route_id'], [])
+            for group_id in segment_group_ids.get(segment['segment_key'], []):
+                if group_id not in group_ids:
+                    group_ids.append(group_id)
+        return route_groups
+
+    def merge_route_insights(self, group_insights: Dict, routes: Dict, segment_group_ids: Dict, segments) -> Dict:
+        """Attach group insights to each route in travel order"""
+        route_insights = {}
+        for route_id, group_ids in self.route_group_ids(segment_group_ids, segments).items():
+            route_insights[f"route_{route_id}"] = {
+                'route_id': route_id,
+                'insights': [group_insights[group_id] for group_id in group_ids if group_id in group_insights],
+                'last_updated': datetime.now().isoformat()
+            }
+        
+        # Add insights to routes
+        routes['insights'] = [route_insights.get(f"route_{i}", {}) for i in range(len(routes['routes']))]
+        
+        return routes
+
+    async def build_route_structures(self, origin: str, destination: str, departure_time: int,
+                                     retries: int = 0) -> tuple:
+        """Directions response plus the derived segments and segment groups"""
+        # Step 1: Get routes (async); nothing can be returned without them, so retry
+        for attempt in range(retries + 1):
+            try:
+                routes = await self.get_multiple_routes(origin, destination, departure_time)
+                break
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                logger.warning(f"Directions request failed ({e}); retrying")
+        
+        # Step 2: Create route segments (fast, synchronous)
+        route_segments = self.create_route_segments(routes['routes'], departure_time)
+        
+        # Step 3: Combine nearby segments (fast, synchronous)
+        combined_segments = self.nearby_segments_combiner(route_segments)
+        
+        return routes, route_segments, combined_segments
+
+    async def get_route_structures(self, origin: str, destination: str, departure_time: int,
+                                   retries: int = 0) -> tuple:
+        """
+        Cached build_route_structures keyed by normalized origin, destination
+        and departure bucket. Cached structures are shared between requests and
+        must not be mutated; the routes dict is copied because the response adds
+        top-level keys to it.
+        """
+        key = (
+            normalize_place(origin),
+            normalize_place(destination),
+            departure_time // 1000 // DIRECTIONS_BUCKET_SECONDS
+        )
+        routes, route_segments, combined_segments = await directions_cache.get_or_fetch(
+            key,
+            lambda: self.build_route_structures(origin, destination, departure_time, retries),
+            should_cache=lambda structures: structures[0].get('status') == 'OK',
+            metrics=self.cache_metrics['directions']
+        )
+        return (
+            dict(routes),
+            {**route_segments, 'departure_time': departure_time},
+            {**combined_segments, 'departure_time': departure_time}
+        )
+
+    async def get_per_route_insights(self, origin: str, destination: str, departure_time: int,
+                                     deadline: Optional[Deadline] = None, directions_retries: int = 0) -> Dict:
+        """
+        Main optimized method with full async support. With a deadline, sources
+        still running when their budget expires are dropped and fusion runs on
+        whatever arrived; metadata lists what was missing.
+        """
+        try:
+            async for event in self.stream_per_route_insights(
+                origin, destination, departure_time, deadline, directions_retries
+            ):
+                if event['event'] == 'insights':
+                    return event['data']
         except Exception as e:
             logger.error(f"Error in get_per_route_insights: {e}")
             raise
 
+    def build_metadata(self, intelligence_data: Dict, group_insights: Dict,
+                       deadline: Optional[Deadline] = None, fuser: Optional[DataFusion] = None) -> Dict:
+        """Cache counters, prompt sizes, and which sources and group fusions did not make it"""
+        missing_sources = {
+            group_id: group_data['missing_sources']
+            for group_id, group_data in intelligence_data.items()
+            if group_data.get('missing_sources')
+        }
+        unfused_groups = [group_id for group_id in intelligence_data if group_id not in group_insights]
+        fusion_methods = {}
+        for insight in group_insights.values():
+            method = insight.get('fusion_method', 'llm')
+            fusion_methods[method] = fusion_methods.get(method, 0) + 1
+        metadata = {
+            'cache': self.cache_metrics,
+            'missing_sources': missing_sources,
+            'unfused_groups': unfused_groups,
+            'fusion_methods': fusion_methods,
+            'fusion_completed': not unfused_groups,
+            'partial': bool(missing_sources) or bool(unfused_groups),
+            'prompts': {
+                'fusion': fuser.prompt_stats if fuser else None,
+                'web_analysis': self._traffic_analyzer.prompt_stats if self._traffic_analyzer else None
+            }
+        }
+        if deadline is not None:
+            metadata['deadline'] = {
+                'budget_seconds': deadline.seconds,
+                'remaining_seconds': round(deadline.remaining(), 3)
+            }
+        return metadata
+
+    async def stream_per_route_insights(self, origin: str, destination: str, departure_time: int,
+                                        deadline: Optional[Deadline] = None,
+                                        directions_retries: int = 0) -> AsyncIterator[Dict]:
+        """
+        Progressive variant of get_per_route_insights. Yields events:
+        'routes' (directions and segment groups) as soon as they are known,
+        'group_intelligence' once per group as its sources complete, and
+        'insights' with the fused result, i.e. what get_per_route_insights returns.
+        Each group is fused as soon as its sources are in, concurrently with
+        the groups still collecting.
+        """
+        # Steps 1-3: Routes, segments and segment groups (cached per OD pair)
+        routes, route_segments, combined_segments = await asyncio.wait_for(
+            self.get_route_structures(origin, destination, departure_time, directions_retries),
+            deadline.timeout() if deadline else None
+        )
+        yield {
+            'event': 'routes',
+            'data': {
+                **routes,
+                'segment_groups': [
+                    {key: group[key] for key in ('group_id', 'center_lat', 'center_lng', 'bbox')}
+                    for group in combined_segments['segment_groups']
+                ],
+                'segment_group_ids': combined_segments['segment_group_ids']
+            }
+        }
+        
+        # Steps 4-5: Collect intelligence and fuse each group as it completes
+        fuser = DataFusion(gemini_api_key=self.config.gemini_api_key, priority=self.priority)
+        intelligence_data = {}
+        fusion_tasks = {}
+        try:
+            async for group_id, group_data in self.iter_intelligence(combined_segments, deadline):
+                intelligence_data[group_id] = group_data
+                fusion_tasks[group_id] = asyncio.ensure_future(
+                    self.fuse_group(fuser, group_id, group_data, deadline)
+                )
+                yield {
+                    'event': 'group_intelligence',
+                    'group_id': group_id,
+                    'data': group_data['intelligence_data'],
+                    'missing_sources': group_data['missing_sources']
+                }
+            insights = await asyncio.gather(*fusion_tasks.values())
+        finally:
+            for task in fusion_tasks.values():
+                task.cancel()
+        
+        group_insights = {
+            group_id: insight for group_id, insight in zip(fusion_tasks, insights) if insight is not None
+        }
+        intelligence_data = self.order_by_group(intelligence_data, combined_segments)
+        routes_with_insights = self.merge_route_insights(
+            group_insights, routes,
+            combined_segments['segment_group_ids'],
+            route_segments['unique_segments']
+        )
+        routes_with_insights['metadata'] = self.build_metadata(intelligence_data, group_insights, deadline, fuser)
+        yield {'event': 'insights', 'data': routes_with_insights}
+
+    async def evaluate_departure(self, departure_time: int, intelligence_data: Dict, groups: Dict,
+                                 corridor: CorridorPosts, route_groups: Dict, routes: Dict) -> Optional[Dict]:
+        """
+        One departure slot: refresh the time-dependent parts of each group's
+        collected intelligence, fuse each group with the rule engine and
+        estimate every route's duration. Flow is the reading collected for the
+        sweep and is the same for every slot. None if there is no route.
+        """
+        departure_ts = departure_time // 1000
+        weather = await asyncio.gather(*(
+            self.get_weather_data(groups[group_id]['center_lat'], groups[group_id]['center_lng'], departure_ts)
+            for group_id in intelligence_data
+        ), return_exceptions=True)
+
+        group_insights = {}
+        for (group_id, group_data), weather_data in zip(intelligence_data.items(), weather):
+            intelligence = group_data['intelligence_data']
+            slot_data = {**group_data, 'intelligence_data': {
+                **intelligence,
+                'traffic_incidents': [
+                    incident for incident in intelligence.get('traffic_incidents') or []
+                    if incident_active_at(incident, departure_ts)
+                ],
+                'weather_data': weather_data if isinstance(weather_data, dict) else {},
+                'user_reports': score_group_reports(corridor, groups[group_id], departure_ts),
+            }}
+            group_insights[group_id] = fuse_group_rules(group_id, slot_data)
+
+        route_results = []
+        for route_id in range(len(routes['routes'])):
+            group_ids = route_groups.get(route_id, [])
+            insights = [group_insights[group_id] for group_id in group_ids if group_id in group_insights]
+            delay = sum(insight['estimated_total_delay'] for insight in insights)
+            level = max((STATUS_LEVELS.index(insight['overall_status']) for insight in insights), default=0)
+            incident_count = sum(len(insight['active_incidents']) for insight in insights)
+            base_minutes = routes['routes'][route_id]['legs'][0]['duration']['value'] / 60
+            route_results.append({
+                'route_id': route_id,
+                'summary': routes['routes'][route_id].get('summary'),
+                'base_duration_minutes': round(base_minutes),
+                'estimated_delay_minutes': delay,
+                'estimated_duration_minutes': round(base_minutes + delay),
+                'overall_status': STATUS_LEVELS[level],
+                'recommendation': recommend(level, delay, incident_count),
+                'key_factors': [factor for insight in insights for factor in insight['key_factors']][:3]
+            })
+
+        if not route_results:
+            return None
+        best = min(route_results, key=lambda r: (r['recommendation'] == 'avoid', r['estimated_duration_minutes']))
+        return {
+            'departure_time': departure_time,
+            'departure': datetime.fromtimestamp(departure_ts).isoformat(),
+            'best_route_id': best['route_id'],
+            'estimated_duration_minutes': best['estimated_duration_minutes'],
+            'overall_status': best['overall_status'],
+            'recommendation': best['recommendation'],
+            'routes': route_results
+        }
+
+    async def sweep_departure_window(self, origin: str, destination: str, departure_times: List[int],
+                                     deadline: Optional[Deadline] = None, directions_retries: int = 0) -> Dict:
+        """
+        Rank departure times for one origin/destination pair. Directions,
+        segment groups, incidents, web search, flow and corridor posts are
+        fetched once for the first departure; each slot only re-evaluates
+        weather, incident end times and report ages, and fuses groups with
+        the rule engine, so extra slots cost no external API or Gemini calls
+        beyond weather for new hours. Flow is only collected when the first
+        departure is near; it is then the current reading for every slot
+        (metadata.flow_basis 'current'), otherwise no slot uses flow ('none').
+        """
+        routes, route_segments, combined_segments = await asyncio.wait_for(
+            self.get_route_structures(origin, destination, departure_times[0], directions_retries),
+            deadline.timeout() if deadline else None
+        )
+        # The corridor posts fetched for collection are reused to rescore reports per slot
+        corridor_posts = asyncio.ensure_future(fetch_corridor_posts(combined_segments['corridor_cells']))
+        try:
+            intelligence_data = await self.collect_intelligence(combined_segments, deadline, corridor_posts)
+            corridor = await asyncio.wait_for(corridor_posts, deadline.timeout() if deadline else None)
+        finally:
+            corridor_posts.cancel()
+        groups = {group['group_id']: group for group in combined_segments['segment_groups']}
+        route_groups = self.route_group_ids(combined_segments['segment_group_ids'], route_segments['unique_segments'])
+
+        slots = await asyncio.gather(*(
+            self.evaluate_departure(departure_time, intelligence_data, groups, corridor, route_groups, routes)
+            for departure_time in departure_times
+        ))
+        slots = [slot for slot in slots if slot is not None]
+        ranked = sorted(slots, key=lambda slot: (
+            slot['recommendation'] == 'avoid', slot['estimated_duration_minutes'], slot['departure_time']
+        ))
+        for rank, slot in enumerate(ranked, 1):
+            slot['rank'] = rank
+
+        return {
+            'origin': origin,
+            'destination': destination,
+            'best_departure': ranked[0] if ranked else None,
+            'slots': ranked,
+            'metadata': {
+                'cache': self.cache_metrics,
+                'missing_sources': {
+                    group_id: group_data['missing_sources']
+                    for group_id, group_data in intelligence_data.items()
+                    if group_data.get('missing_sources')
+                },
+                'fusion_method': 'rules',
+                'flow_basis': 'current' if any(
+                    group_data['intelligence_data'].get('traffic_flow')
+                    for group_data in intelligence_data.values()
+                ) else 'none',
+                'static_sources_departure_time': departure_times[0],
+                'slots_evaluated': len(slots)
+            }
+        }
+
 # Usage example with async context manager
 async def main():
     async with SynapCitySmartTrafficIntelligence() as synap_city:
@@ -4,14 +4,15 @@ Handles Gemini AI analysis and traffic data processing
 """
 
 from google import genai
-import json
-import re
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 import logging
 
 from .web_search import WebSearcher
+from ...core.deadline import Deadline
+from ...core.gemini_governor import gemini_governor, Priority, estimate_tokens, DEFAULT_OUTPUT_TOKENS
+from ...utils.llm_json import LLMJSONError, json_generation_config, parse_gemini_response
 
 logger = logging.getLogger(__name__)
 file_handler = logging.FileHandler("traffic_analyzer.log")
@@ -25,7 +26,8 @@ class SearchQuery:
     departure_time: str
 
 class TrafficAnalyzer:
-    def __init__(self, gemini_api_key: str, search_api_key: str = None, search_engine_id: str = None):
+    def __init__(self, gemini_api_key: str, search_api_key: str = None, search_engine_id: str = None,
+                 priority: Priority = Priority.STANDARD):
         """
         Initialize the traffic analyzer
         
@@ -33,13 +35,16 @@ class TrafficAnalyzer:
             gemini_api_key: Google Gemini API key
             search_api_key: Google Custom Search API key (optional)
             search_engine_id: Google Custom Search Engine ID (optional)
+            priority: Gemini governor lane for the analysis calls
         """
         self.gemini_api_key = gemini_api_key
+        self.priority = priority
         self.client = genai.Client(api_key=self.gemini_api_key)
 
 
         # Initialize web searcher
         self.web_searcher = WebSearcher(search_api_key, search_engine_id)
+        self.prompt_stats = {'prompts': 0, 'prompt_tokens': 0}
 
     def create_user_prompt(self, query: SearchQuery) -> str:
         """Create the user prompt for Gemini"""
@@ -68,7 +73,7 @@ For each identified cause, provide:
 - Impact Level: [HIGH/MODERATE/LOW]
 - Expected Duration: [Estimated clearance time]
 - Alternative Routes: [Specific detour suggestions if available]
-If no current verified incidents are found, respond with: "No current verified incidents found for {query.address} at {query.current_time}. Please check local traffic apps or official traffic authority websites for real-time updates." """
+If no current verified incidents are found, respond with the JSON format above with an empty "incidents" list and a "message" field saying: "No current verified incidents found for {query.address} at {query.current_time}. Please check local traffic apps or official traffic authority websites for real-time updates." """
 
     def create_system_prompt(self) -> str:
         """Create the system prompt for Gemini"""
@@ -125,7 +130,8 @@ RESPONSE FORMAT: You must respond with valid JSON in the following format:
 - Clearly distinguish between confirmed incidents and general patterns
 - If no current incidents found, state this explicitly rather than providing outdated information"""
 
-    async def analyze_with_verified_sources(self, query: SearchQuery, verified_results: List[Dict]) -> Dict[str, Any]:
+    async def analyze_with_verified_sources(self, query: SearchQuery, verified_results: List[Dict],
+                                            deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """Analyze using only verified sources with strict URL requirements"""
         
         # Prepare context with verified sources only
@@ -158,12 +164,19 @@ AVAILABLE VERIFIED URLS:
         
         user_prompt = self.create_user_prompt(query)
         full_prompt = f"{system_prompt}\n\n{context}\n\n{user_prompt}"
+        self.prompt_stats['prompts'] += 1
+        self.prompt_stats['prompt_tokens'] += estimate_tokens(full_prompt)
         
         try:
             logger.info("Sending prompt to Gemini...")
-            response = self.client.models.generate_content(
+            response = await gemini_governor.acall(
+                        self.client.aio.models.generate_content,
                         model='gemini-2.5-flash-lite',
-                        contents=full_prompt)
+                        contents=full_prompt,
+                        config=json_generation_config(timeout_seconds=deadline.timeout() if deadline else None),
+                        priority=self.priority,
+                        estimated_tokens=estimate_tokens(full_prompt) + DEFAULT_OUTPUT_TOKENS,
+                        deadline=deadline.expires_at if deadline else None)
             
             # Check if response exists and has text
             if not response or not hasattr(response, 'text') or not response.text:
@@ -179,41 +192,21 @@ AVAILABLE VERIFIED URLS:
             logger.info(f"Gemini response length: {len(response_text)}")
             logger.debug(f"Gemini response preview: {response_text[:200]}...")
             
-            # Try to extract JSON from response
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                logger.info("Found JSON in Gemini response")
-                try:
-                    result = json.loads(json_str)
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse extracted JSON: {e}")
-                    logger.error(f"JSON string: {json_str[:500]}...")
-                    # Return fallback response
-                    return {
-                        "address": query.address,
-                        "timestamp": datetime.now().isoformat() + "Z",
-                        "incidents": [],
-                        "error": f"JSON parsing failed: {e}",
-                        "raw_response": response_text[:1000]
-                    }
-            else:
-                logger.warning("No JSON found in Gemini response, trying to parse entire response")
-                try:
-                    result = json.loads(response_text)
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse entire response as JSON: {e}")
-                    logger.error(f"Response text: {response_text[:500]}...")
-                    
-                    # Create a structured response from unstructured text
-                    return {
-                        "address": query.address,
-                        "timestamp": datetime.now().isoformat() + "Z",
-                        "incidents": [],
-                        "message": response_text if len(response_text) < 500 else response_text[:500] + "...",
-                        "error": "Gemini did not return valid JSON",
-                        "raw_response": response_text[:1000]
-                    }
+            try:
+                result = parse_gemini_response(response)
+            except LLMJSONError as e:
+                logger.error(f"Gemini did not return valid JSON: {e}")
+                logger.error(f"Response text: {response_text[:500]}...")
+                
+                # Create a structured response from unstructured text
+                return {
+                    "address": query.address,
+                    "timestamp": datetime.now().isoformat() + "Z",
+                    "incidents": [],
+                    "message": response_text if len(response_text) < 500 else response_text[:500] + "...",
+                    "error": "Gemini did not return valid JSON",
+                    "raw_response": response_text[:1000]
+                }
             
             # Double-check all URLs in the response
             for incident in result.get('incidents', []):
@@ -258,18 +251,9 @@ AVAILABLE VERIFIED URLS:
         
         return analysis
 
-    async def search_and_analyze(self, query: SearchQuery) -> Dict[str, Any]:
-        """Main method to search web and analyze traffic information with verified sources"""
-        logger.info(f"Starting traffic analysis for {query.address}")
-        
-        # Generate targeted search queries
-        search_queries = self.web_searcher.generate_traffic_search_queries(
-            query.address, query.current_time, query.departure_time
-        )
-        
-        # Perform searches and verify sources
-        verified_results = await self.web_searcher.search_and_verify_sources(search_queries)
-        
+    async def analyze_sources(self, query: SearchQuery, verified_results: List[Dict],
+                              deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """Analyze already searched and verified sources (e.g. one group's share of a route search)"""
         if not verified_results:
             return {
                 "address": query.address,
@@ -280,7 +264,7 @@ AVAILABLE VERIFIED URLS:
 
 
         # Analyze with Gemini using only verified sources
-        analysis = await self.analyze_with_verified_sources(query, verified_results)
+        analysis = await self.analyze_with_verified_sources(query, verified_results, deadline)
         
         # Post-process to ensure all URLs in response are verified
         analysis = await self.validate_response_urls(analysis, verified_results)
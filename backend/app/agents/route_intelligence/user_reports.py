@@ -0,0 +1,204 @@
+"""
+User Reports Module
+Fetches recent traffic-related community posts along a route corridor and
+scores them per segment group. The corridor is the set of geohash cells (the
+precision posts are stored at) covering the route samples and their
+neighbours, so the Firestore reads grow with the route, not with the posts
+collection. Cells are cached briefly and shared between requests; timestamps
+are parsed once when a post is fetched and scoring is one numpy pass per group.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from google.cloud.firestore_v1 import FieldFilter
+
+from .segment_grouping import EARTH_RADIUS_M
+from ...core.cache import TTLCache
+from ...core.firebase import db
+from ...utils.geohash_utils import encode_geohash, get_geohash_neighbors
+
+USER_REPORT_GEOHASH_PRECISION = 6  # precision posts are stored with
+USER_REPORT_LOOKBACK_HOURS = 24
+USER_REPORT_CELL_TTL_SECONDS = 60
+USER_REPORT_CELL_CACHE_SIZE = 20000
+USER_REPORT_MIN_SCORE = 30
+# Firestore allows at most 30 disjunctions (geohash values x categories) per query
+FIRESTORE_DISJUNCTION_LIMIT = 30
+
+# Category -> (score, max age in hours) for posts that can affect traffic
+TRAFFIC_POST_CATEGORIES = {
+    'transportation': (10, 4),
+    'safety': (7, 6),
+    'infrastructure': (8, 24),
+}
+CATEGORY_NAMES = list(TRAFFIC_POST_CATEGORIES)
+CATEGORY_SCORES = np.array([TRAFFIC_POST_CATEGORIES[c][0] for c in CATEGORY_NAMES], dtype=float)
+CATEGORY_MAX_AGE_HOURS = np.array([TRAFFIC_POST_CATEGORIES[c][1] for c in CATEGORY_NAMES], dtype=float)
+
+post_cell_cache = TTLCache(max_size=USER_REPORT_CELL_CACHE_SIZE, ttl_seconds=USER_REPORT_CELL_TTL_SECONDS)
+logger = logging.getLogger("SynapCityLogger")
+
+
+@dataclass
+class CorridorPosts:
+    """Posts along a route plus parallel arrays used for scoring"""
+    posts: List[Dict]
+    lat: np.ndarray
+    lng: np.ndarray
+    created_ts: np.ndarray
+    votes: np.ndarray
+    category: np.ndarray  # index into CATEGORY_NAMES
+
+    @classmethod
+    def from_posts(cls, posts: List[Dict]) -> "CorridorPosts":
+        return cls(
+            posts=posts,
+            lat=np.array([p['latitude'] for p in posts], dtype=float),
+            lng=np.array([p['longitude'] for p in posts], dtype=float),
+            created_ts=np.array([p['created_ts'] for p in posts], dtype=float),
+            votes=np.array([p['upvotes'] - p['downvotes'] for p in posts], dtype=float),
+            category=np.array([CATEGORY_NAMES.index(p['category']) for p in posts], dtype=np.int64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.posts)
+
+
+def corridor_cells(lats: np.ndarray, lngs: np.ndarray,
+                   precision: int = USER_REPORT_GEOHASH_PRECISION) -> List[str]:
+    """Geohash cells containing the route samples, plus their neighbours"""
+    centres = {encode_geohash(float(lat), float(lng), precision) for lat, lng in zip(lats, lngs)}
+    return sorted({cell for centre in centres for cell in get_geohash_neighbors(centre)})
+
+
+def _timestamp(value) -> Optional[float]:
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+def slim_post(post_id: str, data: Dict) -> Optional[Dict]:
+    """The fields route scoring and fusion use, or None for posts that do not qualify"""
+    if data.get('category') not in TRAFFIC_POST_CATEGORIES:
+        return None
+    if data.get('type') == 'resolved' or data.get('status') == 'resolved':
+        return None
+    location = data.get('location')
+    if isinstance(location, dict):
+        lat, lng = location.get('latitude'), location.get('longitude')
+    else:
+        lat, lng = getattr(location, 'latitude', None), getattr(location, 'longitude', None)
+    created_ts = _timestamp(data.get('createdAt'))
+    if lat is None or lng is None or created_ts is None:
+        return None
+    return {
+        'postId': post_id,
+        'content': data.get('content', ''),
+        'type': data.get('type'),
+        'category': data['category'],
+        'neighborhood': data.get('neighborhood'),
+        'geohash': data.get('geohash'),
+        'latitude': float(lat),
+        'longitude': float(lng),
+        'upvotes': data.get('upvotes', 0) or 0,
+        'downvotes': data.get('downvotes', 0) or 0,
+        'createdAt': datetime.fromtimestamp(created_ts, tz=timezone.utc).isoformat(),
+        'created_ts': created_ts,
+    }
+
+
+def _query_cells(cells: List[str], since: datetime) -> Dict[str, List[Dict]]:
+    """Recent traffic-category posts in the given cells (blocking Firestore query)"""
+    by_cell = {cell: [] for cell in cells}
+    query = (db.collection('posts')
+             .where(filter=FieldFilter('geohash', 'in', cells))
+             .where(filter=FieldFilter('category', 'in', CATEGORY_NAMES))
+             .where(filter=FieldFilter('createdAt', '>=', since)))
+    for doc in query.stream():
+        post = slim_post(doc.id, doc.to_dict())
+        if post is not None and post['geohash'] in by_cell:
+            by_cell[post['geohash']].append(post)
+    return by_cell
+
+
+async def fetch_corridor_posts(cells: Iterable[str], now: Optional[float] = None) -> CorridorPosts:
+    """
+    Posts from the last USER_REPORT_LOOKBACK_HOURS in the corridor cells.
+    Cached cells are reused; the rest are queried in batches concurrently.
+    Cells whose batch fails are skipped (and not cached).
+    """
+    posts: Dict[str, Dict] = {}
+    missing = []
+    for cell in cells:
+        cached = post_cell_cache.get(cell)
+        if cached is None:
+            missing.append(cell)
+        else:
+            posts.update((p['postId'], p) for p in cached)
+
+    if missing and db is not None:
+        now = time.time() if now is None else now
+        since = datetime.fromtimestamp(now - USER_REPORT_LOOKBACK_HOURS * 3600, tz=timezone.utc)
+        batch_size = max(1, FIRESTORE_DISJUNCTION_LIMIT // len(CATEGORY_NAMES))
+        batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+        results = await asyncio.gather(
+            *(asyncio.to_thread(_query_cells, batch, since) for batch in batches),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error fetching corridor posts: {result}")
+                continue
+            for cell, cell_posts in result.items():
+                post_cell_cache.set(cell, cell_posts)
+                posts.update((p['postId'], p) for p in cell_posts)
+
+    return CorridorPosts.from_posts(list(posts.values()))
+
+
+def score_group_reports(corridor: CorridorPosts, group: Dict, departure_ts: float) -> List[Dict]:
+    """
+    Reports inside a group's bbox, scored on age at departure, distance to the
+    group centre, votes and category; only scores above USER_REPORT_MIN_SCORE
+    are kept, best first.
+    """
+    if not len(corridor):
+        return []
+    bbox = group['bbox']
+    age_hours = (departure_ts - corridor.created_ts) / 3600
+    mask = ((corridor.lat >= bbox['sw_lat']) & (corridor.lat <= bbox['ne_lat']) &
+            (corridor.lng >= bbox['sw_lng']) & (corridor.lng <= bbox['ne_lng']) &
+            (age_hours <= CATEGORY_MAX_AGE_HOURS[corridor.category]))
+    if not mask.any():
+        return []
+
+    lat = np.radians(corridor.lat[mask])
+    lng = np.radians(corridor.lng[mask])
+    centre_lat, centre_lng = np.radians(group['center_lat']), np.radians(group['center_lng'])
+    a = (np.sin((lat - centre_lat) / 2) ** 2 +
+         np.cos(lat) * np.cos(centre_lat) * np.sin((lng - centre_lng) / 2) ** 2)
+    distance = EARTH_RADIUS_M * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    score = (np.maximum(0, 20 - age_hours[mask] * 5) +
+             np.maximum(0, 40 - distance / 25) +
+             np.clip(20 + corridor.votes[mask], 0, 20) +
+             CATEGORY_SCORES[corridor.category[mask]])
+
+    indices = np.flatnonzero(mask)
+    keep = np.flatnonzero(score > USER_REPORT_MIN_SCORE)
+    keep = keep[np.argsort(-score[keep], kind='stable')]
+    return [
+        {**corridor.posts[indices[i]], 'group_id': group['group_id'], 'score': int(round(score[i]))}
+        for i in keep.tolist()
+    ]
@@ -7,12 +7,47 @@ import aiohttp
 import asyncio
 from bs4 import BeautifulSoup
 from urllib.parse import quote_plus, urlparse
-from typing import Dict, List, Any
+from typing import Dict, Hashable, List, Any
 import logging
 from datetime import datetime
 
+from ...core.cache import TTLCache
+from ...core.http_clients import http_clients
+from ...core.rate_limit import TokenBucket
+
 logger = logging.getLogger(__name__)
 
+MAX_SEARCH_QUERIES = 15
+MAX_VERIFY_CANDIDATES = 25
+# The analyzer only reads the top 10 verified sources
+MIN_VERIFIED_SOURCES = 10
+VERIFY_CONCURRENCY_PER_HOST = 2
+SEARCH_DATE_RESTRICT = 'd7'  # Results from last 7 days for traffic relevancy
+
+SEARCH_CACHE_TTL_SECONDS = 600
+# A reachable URL is rechecked soon; an unreachable one is left alone for longer
+VERIFIED_URL_TTL_SECONDS = 600
+UNREACHABLE_URL_TTL_SECONDS = 3600
+
+# Shared by every WebSearcher in the process: short bursts, ~3 queries/s sustained
+search_rate_limiter = TokenBucket(capacity=5, refill_per_second=3)
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+# Search results and URL checks shared by every TrafficAnalyzer in the process
+search_results_cache = TTLCache(max_size=2000, ttl_seconds=SEARCH_CACHE_TTL_SECONDS)
+url_verification_cache = TTLCache(max_size=5000, ttl_seconds=VERIFIED_URL_TTL_SECONDS)
+
+
+def normalize_query(query: str) -> str:
+    return ' '.join(query.lower().split())
+
+
+def host_semaphore(domain: str) -> asyncio.Semaphore:
+    """Per-host cap on concurrent verification requests"""
+    semaphore = _host_semaphores.get(domain)
+    if semaphore is None:
+        semaphore = _host_semaphores[domain] = asyncio.Semaphore(VERIFY_CONCURRENCY_PER_HOST)
+    return semaphore
+
 class WebSearcher:
     def __init__(self, search_api_key: str = None, search_engine_id: str = None):
         """
@@ -192,8 +227,13 @@ class WebSearcher:
         # Use Google Custom Search API only
         if self.search_api_key and self.search_engine_id:
             try:
-                google_results = await self._google_custom_search(query, max_results)
-                results.extend(google_results)
+                num = min(max_results, 5)
+                google_results = await search_results_cache.get_or_fetch(
+                    (normalize_query(query), SEARCH_DATE_RESTRICT, num),
+                    lambda: self._google_custom_search(query, num)
+                )
+                # Callers annotate results in place; keep the cached copies clean
+                results.extend(dict(result) for result in google_results)
                 logger.info(f"Google Search returned {len(google_results)} results for: {query}")
             except Exception as e:
                 logger.error(f"Google Custom Search failed for query '{query}': {e}")
@@ -206,28 +246,26 @@ class WebSearcher:
         return results[:max_results]
 
     async def _google_custom_search(self, query: str, max_results: int) -> List[Dict]:
-        """Use Google Custom Search API"""
+        """Use Google Custom Search API; raises on API errors so they are not cached"""
         url = "https://www.googleapis.com/customsearch/v1"
         params = {
             'key': self.search_api_key,
             'cx': self.search_engine_id,
             'q': query,
             'num': min(max_results, 5),  # Google API max is 10
-            'dateRestrict': 'd7',  # Results from last 7 days for traffic relevancy
+            'dateRestrict': SEARCH_DATE_RESTRICT,
             'sort': 'date'  # Sort by most recent first
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status != 200:
-                    logger.error(f"Google Search API error: {response.status}")
-                    return []
-                
-                data = await response.json()
-                
-                if 'error' in data:
-                    logger.error(f"Google Search API error: {data['error']}")
-                    return []
+        await search_rate_limiter.acquire_async()
+        async with http_clients.session('web_search').get(url, params=params) as response:
+            if response.status != 200:
+                raise RuntimeError(f"Google Search API error: {response.status}")
+            
+            data = await response.json()
+            
+            if 'error' in data:
+                raise RuntimeError(f"Google Search API error: {data['error']}")
         
         results = []
         for item in data.get('items', []):
@@ -243,12 +281,25 @@ class WebSearcher:
         return results
 
     async def verify_url(self, url: str) -> bool:
-        """Verify that a URL is accessible with faster timeout"""
+        """Verify that a URL is accessible, using the shared verification cache"""
+        async def check() -> bool:
+            reachable = await self._check_url(url)
+            if not reachable:
+                # Only a fresh check (not a cache hit) starts the unreachable TTL
+                url_verification_cache.set(url, False, UNREACHABLE_URL_TTL_SECONDS)
+            return reachable
+
+        return await url_verification_cache.get_or_fetch(url, check, should_cache=bool)
+
+    async def _check_url(self, url: str) -> bool:
+        """HEAD request with a short timeout, at most a few at a time per host"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.head(url, headers=self.headers, timeout=3) as response:  # Reduced timeout
+            session = http_clients.session('scrape')
+            async with host_semaphore(self.extract_domain(url)):
+                async with session.head(url, headers=self.headers, timeout=aiohttp.ClientTimeout(total=3)) as response:  # Reduced timeout
                     return 200 <= response.status < 400  # Accept redirects too
-        except:
+        except Exception:
+            # Cancellation (early cutoff, abandoned shared fetch) propagates and is not cached
             return False
 
     async def scrape_content(self, url: str) -> str:
@@ -265,113 +316,105 @@ class WebSearcher:
                 logger.info(f"Skipping problematic domain: {domain}")
                 return ""
             
-            # Set up session with proper headers and encoding
-            timeout = aiohttp.ClientTimeout(total=10)
-            connector = aiohttp.TCPConnector(limit=10)
-            
-            async with aiohttp.ClientSession(
-                timeout=timeout, 
-                connector=connector,
-                headers=self.headers
-            ) as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        logger.warning(f"HTTP {response.status} for {url}")
-                        return ""
-                    
-                    # Get content with proper encoding handling
-                    try:
-                        # Try to get encoding from response headers
-                        content_type = response.headers.get('content-type', '')
-                        if 'charset=' in content_type:
-                            encoding = content_type.split('charset=')[1].split(';')[0].strip()
-                        else:
-                            encoding = 'utf-8'  # Default to UTF-8
-                        
-                        # Read content as bytes first
-                        content_bytes = await response.read()
-                        
-                        # Try multiple encoding strategies
-                        html = None
-                        encodings_to_try = [encoding, 'utf-8', 'latin1', 'iso-8859-1', 'cp1252']
-                        
-                        for enc in encodings_to_try:
-                            try:
-                                html = content_bytes.decode(enc, errors='ignore')
-                                break
-                            except (UnicodeDecodeError, LookupError):
-                                continue
-                        
-                        if not html:
-                            logger.warning(f"Could not decode content from {url}")
-                            return ""
-                        
-                    except Exception as e:
-                        logger.warning(f"Encoding error for {url}: {e}")
-                        # Fallback: read as text with error handling
-                        html = await response.text(errors='ignore')
-                    
-                    # Parse with BeautifulSoup
-                    soup = BeautifulSoup(html, 'html.parser')
+            # Pooled session; headers are sent per request
+            async with http_clients.session('scrape').get(url, headers=self.headers) as response:
+                if response.status != 200:
+                    logger.warning(f"HTTP {response.status} for {url}")
+                    return ""
+                
+                # Get content with proper encoding handling
+                try:
+                    # Try to get encoding from response headers
+                    content_type = response.headers.get('content-type', '')
+                    if 'charset=' in content_type:
+                        encoding = content_type.split('charset=')[1].split(';')[0].strip()
+                    else:
+                        encoding = 'utf-8'  # Default to UTF-8
                     
-                    # Remove unwanted elements
-                    for element in soup(["script", "style", "nav", "header", "footer", "aside", "form"]):
-                        element.decompose()
+                    # Read content as bytes first
+                    content_bytes = await response.read()
                     
-                    # Extract main content areas first
-                    main_content = ""
-                    content_selectors = [
-                        'main', 'article', '.content', '.post', '.news', 
-                        '.article-content', '.story-content', '#content'
-                    ]
+                    # Try multiple encoding strategies
+                    html = None
+                    encodings_to_try = [encoding, 'utf-8', 'latin1', 'iso-8859-1', 'cp1252']
                     
-                    for selector in content_selectors:
-                        elements = soup.select(selector)
-                        if elements:
-                            main_content = ' '.join([elem.get_text() for elem in elements])
+                    for enc in encodings_to_try:
+                        try:
+                            html = content_bytes.decode(enc, errors='ignore')
                             break
+                        except (UnicodeDecodeError, LookupError):
+                            continue
                     
-                    # If no main content found, get all text
-                    if not main_content:
-                        main_content = soup.get_text()
+                    if not html:
+                        logger.warning(f"Could not decode content from {url}")
+                        return ""
                     
-                    # Clean up the text
-                    lines = (line.strip() for line in main_content.splitlines())
-                    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                    text = ' '.join(chunk for chunk in chunks if chunk and len(chunk) > 3)
+                except Exception as e:
+                    logger.warning(f"Encoding error for {url}: {e}")
+                    # Fallback: read as text with error handling
+                    html = await response.text(errors='ignore')
+                
+                # Parse with BeautifulSoup
+                soup = BeautifulSoup(html, 'html.parser')
+                
+                # Remove unwanted elements
+                for element in soup(["script", "style", "nav", "header", "footer", "aside", "form"]):
+                    element.decompose()
+                
+                # Extract main content areas first
+                main_content = ""
+                content_selectors = [
+                    'main', 'article', '.content', '.post', '.news', 
+                    '.article-content', '.story-content', '#content'
+                ]
+                
+                for selector in content_selectors:
+                    elements = soup.select(selector)
+                    if elements:
+                        main_content = ' '.join([elem.get_text() for elem in elements])
+                        break
+                
+                # If no main content found, get all text
+                if not main_content:
+                    main_content = soup.get_text()
+                
+                # Clean up the text
+                lines = (line.strip() for line in main_content.splitlines())
+                chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+                text = ' '.join(chunk for chunk in chunks if chunk and len(chunk) > 3)
+                
+                # Handle Unicode characters properly
+                try:
+                    # Normalize Unicode characters
+                    import unicodedata
+                    text = unicodedata.normalize('NFKD', text)
+                    
+                    # Replace common problematic characters
+                    replacements = {
+                        '\u20b9': 'Rs.',  # Indian Rupee symbol
+                        '\u2018': "'",    # Left single quotation mark
+                        '\u2019': "'",    # Right single quotation mark
+                        '\u201c': '"',    # Left double quotation mark
+                        '\u201d': '"',    # Right double quotation mark
+                        '\u2013': '-',    # En dash
+                        '\u2014': '-',    # Em dash
+                        '\u2026': '...',  # Horizontal ellipsis
+                    }
                     
-                    # Handle Unicode characters properly
-                    try:
-                        # Normalize Unicode characters
-                        import unicodedata
-                        text = unicodedata.normalize('NFKD', text)
-                        
-                        # Replace common problematic characters
-                        replacements = {
-                            '\u20b9': 'Rs.',  # Indian Rupee symbol
-                            '\u2018': "'",    # Left single quotation mark
-                            '\u2019': "'",    # Right single quotation mark
-                            '\u201c': '"',    # Left double quotation mark
-                            '\u201d': '"',    # Right double quotation mark
-                            '\u2013': '-',    # En dash
-                            '\u2014': '-',    # Em dash
-                            '\u2026': '...',  # Horizontal ellipsis
-                        }
-                        
-                        for old_char, new_char in replacements.items():
-                            text = text.replace(old_char, new_char)
-                        
-                        # Remove or replace remaining non-ASCII characters
-                        text = text.encode('ascii', errors='ignore').decode('ascii')
-                        
-                    except Exception as e:
-                        logger.warning(f"Unicode normalization failed for {url}: {e}")
-                        # Fallback: remove all non-ASCII characters
-                        text = ''.join(char for char in text if ord(char) < 128)
+                    for old_char, new_char in replacements.items():
+                        text = text.replace(old_char, new_char)
                     
-                    # Limit content length and return
-                    return text[:3000] if text else ""
+                    # Remove or replace remaining non-ASCII characters
+                    text = text.encode('ascii', errors='ignore').decode('ascii')
                     
+                except Exception as e:
+                    logger.warning(f"Unicode normalization failed for {url}: {e}")
+                    # Fallback: remove all non-ASCII characters
+                    text = ''.join(char for char in text if ord(char) < 128)
+                
+                # Limit content length and return
+                return text[:3000] if text else ""
+                
         except asyncio.TimeoutError:
             logger.warning(f"Timeout scraping {url}")
             return ""
@@ -386,41 +429,122 @@ class WebSearcher:
         """Extract domain from URL"""
         try:
             return urlparse(url).netloc.lower()
-        except:
+        except Exception:
             return ""
 
-    async def search_and_verify_sources(self, search_queries: List[str]) -> List[Dict]:
-        """Perform searches and verify sources (snippets only - no scraping)"""
-        logger.info(f"Starting search with {len(search_queries)} queries")
-        
-        # Perform searches
-        all_results = []
-        verified_results = []
-        
-        for search_query in search_queries[:15]:  # Process 15 queries
-            logger.info(f"Searching: {search_query}")
-            results = await self.search_web_async(search_query, max_results=8)
-            all_results.extend(results)
-            await asyncio.sleep(0.3)  # Rate limiting
-        
-        logger.info(f"Found {len(all_results)} total search results")
-        
-        # Process results - verify URLs but use snippets instead of scraping
-        for result in all_results[:25]:  # Process top 25 results
-            # Verify URL is accessible (quick HEAD request)
-            if await self.verify_url(result['url']):
-                # Use snippet as content instead of scraping
-                result['content'] = result['snippet']  # Use snippet as main content
-                result['verified'] = True
-                result['content_source'] = 'snippet'  # Mark as snippet-based
-                verified_results.append(result)
-                logger.debug(f"Verified URL: {result['url']}")
-            else:
-                result['verified'] = False
-                logger.debug(f"Failed to verify URL: {result['url']}")
-        
-        logger.info(f"Verified {len(verified_results)} sources using snippets")
-        return verified_results
+    def address_terms(self, address: str) -> List[str]:
+        """Locality names of an address (no city, state, country, numbers) in lowercase"""
+        location_info = self.extract_location_info(address)
+        generic = {location_info['city'].lower(), location_info['state'].lower(), 'india',
+                   *(name.lower() for name in location_info.get('alt_names', []))}
+        terms = []
+        for part in address.split(','):
+            part = part.strip().lower()
+            if len(part) >= 4 and part not in generic and not any(ch.isdigit() for ch in part):
+                terms.append(part)
+        return terms
+
+    async def search_for_groups(self, addresses: Dict[Hashable, str], current_time: str, departure_time: str,
+                                min_verified: int = MIN_VERIFIED_SOURCES) -> Dict[Hashable, List[Dict]]:
+        """
+        Plan the searches of several segment groups together.
+
+        Each group's queries are generated as usual, but every unique query is
+        issued once. Results of a location-level query go to the groups whose
+        address it contains; results of shared city-level queries go to groups
+        whose locality names they mention, or to every group sharing the query
+        when they mention none of them (city-wide news). Searches run concurrently and
+        each candidate URL is verified once, as soon as a search returns it
+        (checks share the per-host limits). Once every group has min_verified
+        sources the remaining searches and checks are cancelled.
+        Returns verified results per group, in query order, then search rank.
+        """
+        plans: Dict[str, tuple] = {}  # normalized query -> (query, [group ids])
+        for group_id, address in addresses.items():
+            queries = self.generate_traffic_search_queries(address, current_time, departure_time)
+            for query in queries[:MAX_SEARCH_QUERIES]:
+                plans.setdefault(normalize_query(query), (query, []))[1].append(group_id)
+        plans_list = list(plans.values())
+        logger.info(f"Planned {len(plans_list)} unique queries for {len(addresses)} groups")
+
+        terms = {group_id: self.address_terms(address) for group_id, address in addresses.items()}
+        candidate_counts = {group_id: 0 for group_id in addresses}
+        seen = {group_id: set() for group_id in addresses}
+        verified: Dict[Hashable, Dict[tuple, Dict]] = {group_id: {} for group_id in addresses}
+        waiting: Dict[str, List[tuple]] = {}  # url -> [(group_id, position, result)] awaiting its check
+        verified_urls: Dict[str, bool] = {}
+
+        def accept(group_id: Hashable, position: tuple, result: Dict):
+            # Use snippet as content instead of scraping
+            verified[group_id][position] = {
+                **result, 'content': result['snippet'],
+                'verified': True, 'content_source': 'snippet'
+            }
+
+        def satisfied(group_id: Hashable) -> bool:
+            return len(verified[group_id]) >= min_verified
+
+        search_tasks = {
+            asyncio.ensure_future(self.search_web_async(query, max_results=8)): query_index
+            for query_index, (query, _) in enumerate(plans_list)
+        }
+        verify_tasks: Dict[asyncio.Future, str] = {}
+        pending = set(search_tasks)
+
+        try:
+            while pending and not all(satisfied(group_id) for group_id in addresses):
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task in verify_tasks:
+                        url = verify_tasks[task]
+                        verified_urls[url] = task.result()
+                        for group_id, position, result in waiting.pop(url, []):
+                            if verified_urls[url]:
+                                accept(group_id, position, result)
+                        continue
+
+                    query_index = search_tasks[task]
+                    query, group_ids = plans_list[query_index]
+                    query_lower = query.lower()
+                    for rank, result in enumerate(task.result()):
+                        url = result.get('url')
+                        if not url:
+                            continue
+                        text = f"{result.get('title', '')} {result.get('snippet', '')}".lower()
+                        locality_groups = {group_id for group_id in group_ids
+                                           if any(term in text for term in terms[group_id])}
+                        for group_id in group_ids:
+                            if (satisfied(group_id) or url in seen[group_id] or
+                                    candidate_counts[group_id] >= MAX_VERIFY_CANDIDATES):
+                                continue
+                            # News naming no group's locality is city-wide and applies to all of them
+                            if not (addresses[group_id].lower() in query_lower or
+                                    group_id in locality_groups or not locality_groups):
+                                continue
+                            seen[group_id].add(url)
+                            candidate_counts[group_id] += 1
+                            position = (query_index, rank)
+                            if url in verified_urls:
+                                if verified_urls[url]:
+                                    accept(group_id, position, result)
+                                continue
+                            if url not in waiting:
+                                waiting[url] = []
+                                verify_task = asyncio.ensure_future(self.verify_url(url))
+                                verify_tasks[verify_task] = url
+                                pending.add(verify_task)
+                            waiting[url].append((group_id, position, result))
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if pending:
+            logger.info(f"Stopped early with enough verified sources; cancelled {len(pending)} pending calls")
+        logger.info(f"Verified {sum(verified_urls.values())} of {len(verified_urls)} checked sources across groups")
+        return {
+            group_id: [results[position] for position in sorted(results)]
+            for group_id, results in verified.items()
+        }
 
     def find_closest_verified_url(self, target_url: str, verified_results: List[Dict]) -> str:
         """Find the closest matching verified URL"""
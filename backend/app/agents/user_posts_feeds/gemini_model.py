@@ -9,13 +9,11 @@ from .post_feed_utils.prompt_creator import (
     create_location_prediction_prompt,
     create_image_content_analysis_prompt)
 from .constants import GEMINI_API_KEY
-import re
-import json
+from ...core.gemini_governor import gemini_governor, Priority, estimate_tokens, DEFAULT_OUTPUT_TOKENS
+from ...utils.llm_json import extract_json, parse_gemini_response
 
 def set_gemini_output_injson(output):
-  json_text = re.search(r'\{.*\}', output, re.DOTALL)
-  output_json = json.loads(json_text.group())
-  return output_json
+  return extract_json(output)
   
 class GeminiModel:
     def __init__(self, api_key) -> None:
@@ -29,6 +27,10 @@ class GeminiModel:
         self.config = types.GenerateContentConfig(
             tools=[grounding_tool]
         )
+        # Every task answers in JSON; without grounding we can ask for it directly
+        self.json_config = types.GenerateContentConfig(
+            response_mime_type="application/json"
+        )
         self.task_prompt_creator = {
             "post_analysis": create_analysis_prompt, 
             "similar_post_summarization": create_similar_posts_summarizer_prompt, 
@@ -40,16 +42,46 @@ class GeminiModel:
         }
 
 
-    def __call__(self, task, google_search=False, gemini_model_type = "gemini-2.5-flash", **kwargs):
+    def _prepare(self, task, google_search, kwargs):
         if task not in self.task_prompt_creator:
             raise ValueError(f"{task} is not supported. Supported tasks are {self.task_prompt_creator.keys()}")
         input_prompt = self.task_prompt_creator[task](kwargs)
-        response = self.client.models.generate_content(
-                                                model=gemini_model_type,
-                                                contents=input_prompt,
-                                                config = self.config if google_search else None
-                                                )
-        return set_gemini_output_injson(response.text)
+        config = self.config if google_search else self.json_config
+        return input_prompt, config
+
+    def __call__(self, task, google_search=False, gemini_model_type = "gemini-2.5-flash", 
+                 priority = Priority.STANDARD, deadline = None, **kwargs):
+        """
+        Run a prompt task through the shared Gemini governor.
+        priority selects the governor lane; deadline is a time.monotonic() timestamp.
+        Blocks the calling thread: use acall() from async code.
+        """
+        input_prompt, config = self._prepare(task, google_search, kwargs)
+        response = gemini_governor.call(
+                                    self.client.models.generate_content,
+                                    model=gemini_model_type,
+                                    contents=input_prompt,
+                                    config = config,
+                                    priority = priority,
+                                    estimated_tokens = estimate_tokens(str(input_prompt)) + DEFAULT_OUTPUT_TOKENS,
+                                    deadline = deadline
+                                    )
+        return parse_gemini_response(response)
+
+    async def acall(self, task, google_search=False, gemini_model_type = "gemini-2.5-flash", 
+                    priority = Priority.STANDARD, deadline = None, **kwargs):
+        """Async counterpart of __call__ for request handlers; waits for admission without blocking the loop"""
+        input_prompt, config = self._prepare(task, google_search, kwargs)
+        response = await gemini_governor.acall(
+                                    self.client.aio.models.generate_content,
+                                    model=gemini_model_type,
+                                    contents=input_prompt,
+                                    config = config,
+                                    priority = priority,
+                                    estimated_tokens = estimate_tokens(str(input_prompt)) + DEFAULT_OUTPUT_TOKENS,
+                                    deadline = deadline
+                                    )
+        return parse_gemini_response(response)
 
 
 
@@ -1,15 +1,19 @@
 import googlemaps
 
+from ...core.geocoding import reverse_geocoder
+
 class GoogleMapsManager:
   def __init__(self, api_key):
     self.gmaps = googlemaps.Client(key=api_key)
 
   def get_state_from_coordinates(self, lat, lon):
-      result = self.gmaps.reverse_geocode((lat, lon))
+      result = reverse_geocoder.reverse_geocode_sync(
+          lat, lon, lambda cell_lat, cell_lon: self.gmaps.reverse_geocode((cell_lat, cell_lon))
+      )
       country = None
       state = None
       district = None
-      for component in result[0]["address_components"]:
+      for component in (result or {}).get("address_components", []):
           if "administrative_area_level_1" in component["types"]:
               state =  component['long_name']  # e.g., "Karnataka"
           if "administrative_area_level_2" in component["types"] or "administrative_area_level_3" in component["types"]:
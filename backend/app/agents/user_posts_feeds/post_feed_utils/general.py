@@ -1,5 +1,7 @@
 import requests
 
+from ....core.http_clients import http_clients
+
 def is_valid_url(url, timeout=10):
     """
     Checks if a URL is reachable and returns HTTP 200 OK.
@@ -12,7 +14,7 @@ def is_valid_url(url, timeout=10):
         bool: True if the URL is reachable and valid, False otherwise.
     """
     try:
-        response = requests.get(url, timeout=timeout, allow_redirects=True)
+        response = http_clients.requests_session().get(url, timeout=timeout, allow_redirects=True)
         return response.status_code == 200
     except requests.RequestException:
         return False
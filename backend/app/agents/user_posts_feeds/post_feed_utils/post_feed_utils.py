@@ -1,9 +1,23 @@
 import math
 import difflib
 from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 from .general import is_valid_url
+from ....core.gemini_governor import Priority, estimate_tokens
+
+# Input budget per summarization call; replaces the old fixed 20-posts batches.
+SUMMARY_BATCH_TOKEN_BUDGET = 2000
+# How many partial summaries are merged by one reduce call.
+SUMMARY_REDUCE_FAN_IN = 4
+# Global cap on concurrent summarization calls, shared by every request.
+MAX_CONCURRENT_SUMMARY_CALLS = 8
+
+_summary_executor = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_SUMMARY_CALLS, 
+    thread_name_prefix="feed-summary"
+)
 
 
 def haversine_distance(lat1, lon1, lat2, lon2):
@@ -59,37 +73,112 @@ def group_all_posts_by_category(all_posts):
         grouped_by_category[category].append(post)
     return dict(grouped_by_category)
 
-def get_all_posts_summary(gemini_model, all_posts, post_summaries_batch_for_feeds = 20):
-    from pprint import pprint
-    pprint(all_posts)
-    print(100*"%")
+def batch_contents_by_token_budget(contents, token_budget = SUMMARY_BATCH_TOKEN_BUDGET):
+    """
+    Split post contents into batches whose estimated size stays within token_budget.
+    A single post larger than the budget still gets a batch of its own.
+    """
+    batches = []
+    current_batch = []
+    current_tokens = 0
+    for content in contents:
+        tokens = estimate_tokens(content)
+        if current_batch and current_tokens + tokens > token_budget:
+            batches.append(current_batch)
+            current_batch = []
+            current_tokens = 0
+        current_batch.append(content)
+        current_tokens += tokens
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
+
+def _summarize_batch(gemini_model, curr_type, category, batch_content):
+    summaries_in_string = ""
+    for idx, cont in enumerate(batch_content):
+        summaries_in_string += f"{idx+1}: {cont}\n"
+    return gemini_model(
+        gemini_model_type = "gemini-2.5-flash-lite",
+        task = "summarizer_prompt_without_using_external_sources", 
+        type = curr_type,
+        issue_tag = category, 
+        summaries = summaries_in_string, 
+        priority = Priority.BACKGROUND,
+        )
+
+
+def get_all_posts_summary(gemini_model, all_posts, token_budget = SUMMARY_BATCH_TOKEN_BUDGET, 
+                          reduce_fan_in = SUMMARY_REDUCE_FAN_IN, executor = None, previous_summaries = None):
+    """
+    Summarize posts per category as a concurrent map-reduce.
+
+    Map: every token-budgeted batch of every category is summarized in parallel.
+    Reduce: partial summaries are merged in a tree, reduce_fan_in at a time, until
+    one summary per category is left. All Gemini calls share one bounded executor,
+    so the number of in-flight requests is capped process-wide.
+
+    previous_summaries (category -> summary with `related_feeds`) makes the run
+    incremental: a category whose posts are all covered reuses its previous
+    summary untouched, and otherwise only the new posts are summarized together
+    with the previous summary text. Categories whose covered posts are no longer
+    all present are summarized from scratch.
+    """
+    executor = executor or _summary_executor
+    previous_summaries = previous_summaries or {}
     grouped_categories = group_all_posts_by_category(all_posts)
+
+    # Map phase: all batches across all categories are submitted up front.
+    partials = {}
     summaries = {}
     for category, posts in grouped_categories.items():
-        contents = [p["content"] for p in posts]
         curr_type = posts[0]["type"]
-        location_neighborhood = posts[0]["neighborhood"]
-        contents = [contents[i:i+post_summaries_batch_for_feeds] for i in range(0, len(contents), post_summaries_batch_for_feeds)]
-
-        final_summary = ""
-        for batch_content in contents:
-            batch_content.append(final_summary)
-            summaries_in_string = ""
-            for idx, cont in enumerate(batch_content):
-                summaries_in_string += f"{idx+1}: {cont}\n"
-            output_json = gemini_model(
-                gemini_model_type = "gemini-2.5-flash-lite",
-                task = "summarizer_prompt_without_using_external_sources", 
-                type = curr_type,
-                issue_tag = category, 
-                summaries = summaries_in_string, 
-                )
-            final_summary = output_json["summary"]
-        
+        contents = [p["content"] for p in posts]
+
+        previous = previous_summaries.get(category)
+        if previous:
+            covered_ids = set(previous.get("related_feeds", []))
+            if covered_ids.issubset(p["postId"] for p in posts):
+                new_contents = [p["content"] for p in posts if p["postId"] not in covered_ids]
+                if not new_contents:
+                    summaries[category] = previous
+                    continue
+                contents = [previous["summary"]] + new_contents
+
+        batches = batch_contents_by_token_budget(contents, token_budget)
+        partials[category] = [
+            executor.submit(_summarize_batch, gemini_model, curr_type, category, batch)
+            for batch in batches
+        ]
+
+    # Reduce phase: each round merges the partials of every unfinished category concurrently.
+    partials = {category: [f.result() for f in futures] for category, futures in partials.items()}
+    while any(len(outputs) > 1 for outputs in partials.values()):
+        next_round = {}
+        for category, outputs in partials.items():
+            curr_type = grouped_categories[category][0]["type"]
+            next_round[category] = []
+            for i in range(0, len(outputs), reduce_fan_in):
+                chunk = outputs[i:i+reduce_fan_in]
+                if len(chunk) == 1:
+                    next_round[category].append(chunk[0])
+                    continue
+                next_round[category].append(executor.submit(
+                    _summarize_batch, gemini_model, curr_type, category, 
+                    [output["summary"] for output in chunk]
+                ))
+        partials = {
+            category: [o.result() if isinstance(o, Future) else o for o in outputs]
+            for category, outputs in next_round.items()
+        }
+
+    for category, outputs in partials.items():
+        posts = grouped_categories[category]
+        output_json = outputs[0]
         output_json.update({
-            "type": curr_type, 
+            "type": posts[0]["type"], 
             "category": category, 
-            "location": location_neighborhood,
+            "location": posts[0]["neighborhood"],
             "posts_counts": len(posts),
             "related_feeds" : [p["postId"] for p in posts]
         })
@@ -97,6 +186,26 @@ def get_all_posts_summary(gemini_model, all_posts, post_summaries_batch_for_feed
     return summaries
 
 
+def get_incremental_posts_summary(gemini_model, all_posts, summary_store, area_cell, radius_km):
+    """
+    Summarize the posts of an area cell and radius, reusing the summaries
+    persisted for them. Only categories that actually changed are written back.
+    """
+    previous_summaries = summary_store.load(area_cell, radius_km)
+    summaries = get_all_posts_summary(
+        gemini_model = gemini_model, 
+        all_posts = all_posts, 
+        previous_summaries = previous_summaries
+    )
+    changed = {
+        category: summary for category, summary in summaries.items()
+        if summary is not previous_summaries.get(category)
+    }
+    if changed:
+        summary_store.save(area_cell, radius_km, changed)
+    return summaries
+
+
 def get_summary_links(gemini_model, feed_data, topk_links = 3, hours_back = 24):
     curr_type = feed_data.get("type", "")
     category = feed_data.get("category", "")
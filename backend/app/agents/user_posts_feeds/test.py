@@ -16,7 +16,7 @@ if __name__ == "__main__":
         st = time.perf_counter()
         a = get_all_posts_summary(gemini_model = gmo, 
                                 all_posts = all_post, 
-                                post_summaries_batch_for_feeds = 20 
+                                token_budget = 2000
                                 )
         print(time.perf_counter() - st)
     pprint(a)
@@ -9,6 +9,7 @@ from ...models.user import User
 from ...models.post import Post, PostCreate, PostType, PostCategory
 from ..deps import get_current_active_user
 from ...agents.user_posts_feeds.gemini_model import GeminiAgent
+from ...core.gemini_governor import Priority
 
 router = APIRouter()
 
@@ -50,7 +51,7 @@ async def create_comment(
         }
         
         # Check for vulgar content in comments
-        gemini_output = GeminiAgent(task = "post_analysis", google_search = True, user_post_message = comment.content)
+        gemini_output = await GeminiAgent.acall(task = "post_analysis", google_search = True, priority = Priority.INTERACTIVE, user_post_message = comment.content)
         
         if gemini_output['sentiment'].lower() == "vulgar":
             raise HTTPException(
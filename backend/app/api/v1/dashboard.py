@@ -2,21 +2,50 @@ from fastapi import APIRouter, HTTPException, status, Query, Depends
 from typing import List, Dict, Optional
 from datetime import datetime, timezone, timedelta
 from collections import defaultdict
+import asyncio
 import math
+import time
 
 from ...core.firebase import db
 from ...models.user import User
 from ..deps import get_current_active_user
-from ...utils.geohash_utils import get_geohash_cells_for_radius, calculate_distance
+from ...utils.geohash_utils import get_geohash_cells_for_radius, calculate_distance, encode_geohash, decode_geohash
 import requests
 import os
 from ...core.config import settings
-from ...agents.user_posts_feeds.post_feed_utils.post_feed_utils import get_all_posts_summary, get_summary_links
+from ...core.cache import TTLCache
+from ...core.feed_summaries import feed_summary_store, feed_summary_area, FEED_SUMMARY_PRECISION
+from ...core.scheduler import RequestHeatTracker
+from ...core.http_clients import http_clients
+from ...agents.user_posts_feeds.post_feed_utils.post_feed_utils import get_incremental_posts_summary, get_summary_links
 from ...agents.user_posts_feeds.gemini_model import GeminiAgent
 
 
 router = APIRouter()
 
+# Background precomputation of recent activities for hot areas
+FEED_PRECOMPUTE_INTERVAL_SECONDS = 300
+FEED_PRECOMPUTE_MAX_AGE_SECONDS = 2 * FEED_PRECOMPUTE_INTERVAL_SECONDS
+FEED_PRECOMPUTE_MAX_AREAS = 20
+SUBSCRIBED_AREA_RADIUS_KM = 5.0
+# Subscriptions change slowly; the users collection is scanned at most this often
+SUBSCRIPTION_COUNTS_TTL_SECONDS = 6 * 3600
+# Ranked subscribed areas kept per scan, leaving room for areas that do not resolve
+SUBSCRIPTION_COUNTS_MAX_AREAS = 5 * FEED_PRECOMPUTE_MAX_AREAS
+AREA_COORDINATES_TTL_SECONDS = 24 * 3600
+# Failed geocodes (errors, quota, no results) are retried on a later tick
+AREA_COORDINATES_RETRY_SECONDS = 600
+GEOHASH_ALPHABET = set("0123456789bcdefghjkmnpqrstuvwxyz")
+
+area_request_tracker = RequestHeatTracker(window_seconds=3600, max_keys=1000)
+# (area cell, radius_km) -> {"activities": [...], "computed_at": epoch seconds}
+precomputed_activities: Dict[tuple, Dict] = {}
+# Subscribed area names ranked by subscriber count (single entry)
+subscription_counts_cache = TTLCache(max_size=1, ttl_seconds=SUBSCRIPTION_COUNTS_TTL_SECONDS)
+# Subscribed area name -> (latitude, longitude), or None when it cannot be resolved
+area_coordinates_cache = TTLCache(max_size=5000, ttl_seconds=AREA_COORDINATES_TTL_SECONDS)
+_UNCACHED = object()
+
 def get_dashboard_stats(latitude: float, longitude: float, radius_km: float = 5.0) -> Dict:
     """
     Get dashboard statistics for the given area.
@@ -145,7 +174,8 @@ def get_recent_activities(latitude: float, longitude: float, radius_km: float =
     Get recent activities from posts in the given area.
     """
     try:
-        # Get geohash cells for the area
+        # Summaries are kept per area cell and radius, so collect around the cell centre
+        area_cell, latitude, longitude, radius_km = feed_summary_area(latitude, longitude, radius_km)
         geohash_cells = get_geohash_cells_for_radius(latitude, longitude, radius_km)
         
         # Collect recent posts from all relevant geohash cells (use dict to avoid duplicates)
@@ -175,16 +205,18 @@ def get_recent_activities(latitude: float, longitude: float, radius_km: float =
                         }
         
         all_posts = list(posts_dict.values())
-        return format_recent_activities(all_posts, limit)
+        return format_recent_activities(all_posts, limit, area_cell, radius_km)
         
     except Exception as e:
         print(f"Error getting recent activities: {str(e)}")
         raise e
         return get_fallback_activities()
 
-def format_recent_activities(posts: List[Dict], limit: int) -> List[Dict]:
+def format_recent_activities(posts: List[Dict], limit: int, area_cell: str, radius_km: float) -> List[Dict]:
     """
     Format posts into recent activities for the dashboard.
+    Feed summaries are incremental per area cell and radius, so only posts added since the
+    last request are sent to the LLM.
     """
     # if not posts:
         # return get_fallback_activities()
@@ -194,12 +226,15 @@ def format_recent_activities(posts: List[Dict], limit: int) -> List[Dict]:
     
     activities = []
     
-    feed_insights = get_all_posts_summary(gemini_model=GeminiAgent, all_posts=posts)
+    feed_insights = get_incremental_posts_summary(
+        gemini_model=GeminiAgent, 
+        all_posts=posts, 
+        summary_store=feed_summary_store, 
+        area_cell=area_cell,
+        radius_km=radius_km
+    )
 
     for feed in (feed_insights or {}).values():
-        from pprint import pprint
-        pprint(feed)
-        
         related_feeds = feed.get('related_feeds', [])
         # Fetch posts whose id comes in related_feeds
         related_posts = []
@@ -251,6 +286,127 @@ def format_recent_activities(posts: List[Dict], limit: int) -> List[Dict]:
         activities.append(data)
     return activities
 
+def get_area_key(latitude: float, longitude: float, radius_km: float) -> tuple:
+    """Key under which activities of an area are tracked and precomputed"""
+    return (encode_geohash(latitude, longitude, FEED_SUMMARY_PRECISION), round(radius_km, 1))
+
+def get_precomputed_activities(latitude: float, longitude: float, radius_km: float) -> Optional[List[Dict]]:
+    """
+    Return activities precomputed by the background job if they are still fresh.
+    """
+    entry = precomputed_activities.get(get_area_key(latitude, longitude, radius_km))
+    if entry and time.time() - entry["computed_at"] < FEED_PRECOMPUTE_MAX_AGE_SECONDS:
+        return entry["activities"]
+    return None
+
+def resolve_area_coordinates(area: str) -> Optional[tuple]:
+    """
+    Resolve a subscribed area to coordinates. Accepts geohashes, "lat,lng"
+    strings and place names (geocoded via Google Maps and remembered for a
+    day; failed lookups are retried after AREA_COORDINATES_RETRY_SECONDS).
+    """
+    area = area.strip()
+    cached = area_coordinates_cache.get(area, _UNCACHED)
+    if cached is not _UNCACHED:
+        return cached
+
+    coordinates = None
+    try:
+        if 4 <= len(area) <= 12 and set(area.lower()) <= GEOHASH_ALPHABET:
+            coordinates = tuple(decode_geohash(area.lower()))
+        elif area.count(',') == 1:
+            lat, lng = (float(part) for part in area.split(','))
+            coordinates = (lat, lng)
+    except ValueError:
+        coordinates = None
+
+    if coordinates is None and settings.GOOGLE_MAPS_API_KEY:
+        try:
+            response = http_clients.requests_session().get(
+                "https://maps.googleapis.com/maps/api/geocode/json",
+                params={"address": area, "key": settings.GOOGLE_MAPS_API_KEY},
+                timeout=3
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"Geocoding API error: {response.status_code}")
+            results = response.json().get("results", [])
+            if results:
+                location = results[0]["geometry"]["location"]
+                coordinates = (location["lat"], location["lng"])
+        except Exception as e:
+            print(f"Error geocoding subscribed area {area}: {str(e)}")
+
+    if coordinates is None:
+        area_coordinates_cache.set(area, None, AREA_COORDINATES_RETRY_SECONDS)
+    else:
+        area_coordinates_cache.set(area, coordinates)
+    return coordinates
+
+def get_ranked_subscribed_areas() -> List[str]:
+    """
+    Subscribed area names, most subscribed first. The users collection is
+    scanned once per SUBSCRIPTION_COUNTS_TTL_SECONDS, not on every tick.
+    """
+    ranked = subscription_counts_cache.get("ranked")
+    if ranked is None:
+        subscription_counts = defaultdict(int)
+        for doc in db.collection('users').select(['subscribedAreas']).stream():
+            for area in doc.to_dict().get('subscribedAreas', []) or []:
+                subscription_counts[area] += 1
+        ranked = sorted(subscription_counts, key=subscription_counts.get, reverse=True)[:SUBSCRIPTION_COUNTS_MAX_AREAS]
+        subscription_counts_cache.set("ranked", ranked)
+    return ranked
+
+def get_subscribed_areas(limit: int) -> List[tuple]:
+    """
+    Return (latitude, longitude, radius_km) of the most subscribed areas.
+    """
+    if db is None:
+        return []
+
+    areas = []
+    for area in get_ranked_subscribed_areas():
+        coordinates = resolve_area_coordinates(area)
+        if coordinates:
+            areas.append((coordinates[0], coordinates[1], SUBSCRIBED_AREA_RADIUS_KM))
+        if len(areas) >= limit:
+            break
+    return areas
+
+def get_hot_areas(limit: int = FEED_PRECOMPUTE_MAX_AREAS) -> List[tuple]:
+    """
+    Hot areas are the most requested areas of the last hour followed by the
+    areas users are subscribed to.
+    """
+    hot_areas = {}
+    for area_key, area in area_request_tracker.hot_keys(limit=limit):
+        hot_areas[area_key] = area
+    if len(hot_areas) < limit:
+        for area in get_subscribed_areas(limit):
+            hot_areas.setdefault(get_area_key(*area), area)
+    return list(hot_areas.values())[:limit]
+
+async def precompute_hot_area_activities():
+    """
+    Scheduled job: recompute recent activities for hot areas so that dashboard
+    requests can be served without waiting for the summarization pipeline.
+    """
+    hot_areas = await asyncio.to_thread(get_hot_areas)
+    for latitude, longitude, radius_km in hot_areas:
+        try:
+            activities = await asyncio.to_thread(get_recent_activities, latitude, longitude, radius_km)
+            precomputed_activities[get_area_key(latitude, longitude, radius_km)] = {
+                "activities": activities,
+                "computed_at": time.time(),
+            }
+        except Exception as e:
+            print(f"Error precomputing activities for {latitude},{longitude}: {str(e)}")
+
+    # Forget areas that are no longer refreshed
+    for area_key in list(precomputed_activities):
+        if time.time() - precomputed_activities[area_key]["computed_at"] > FEED_PRECOMPUTE_MAX_AGE_SECONDS:
+            del precomputed_activities[area_key]
+
 def get_fallback_activities() -> List[Dict]:
     """
     Return fallback activities when no data is available.
@@ -333,7 +489,16 @@ async def get_recent_activities_endpoint(
                 detail="Longitude must be between -180 and 180"
             )
         
-        activities = get_recent_activities(latitude, longitude, radius_km, limit)
+        area_request_tracker.record(
+            get_area_key(latitude, longitude, radius_km), 
+            (latitude, longitude, radius_km)
+        )
+        
+        # Hot areas are served from the background precomputation; cold areas
+        # fall back to generating activities inline.
+        activities = get_precomputed_activities(latitude, longitude, radius_km)
+        if activities is None:
+            activities = await asyncio.to_thread(get_recent_activities, latitude, longitude, radius_km, limit)
         # from pprint import pprint
         # import json
         return {"activities": activities}
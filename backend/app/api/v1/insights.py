@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, status, Query
 from typing import Any, List, Optional, Dict
 from datetime import datetime, timezone, timedelta
+import asyncio
 import random
 import math
 from collections import defaultdict
@@ -13,11 +14,14 @@ from ...agents.user_posts_feeds.gemini_model import GeminiAgent
 
 from ...core.firebase import db
 from ...models.area import Area, AreaTrend
-from ...utils.geohash_utils import get_geohash_cells_for_radius, calculate_distance, create_issue_area_polygon, create_unified_issue_polygon
+from ...utils.geohash_utils import get_geohash_cells_for_radius, calculate_distance, create_issue_area_polygon, create_unified_issue_polygon, encode_geohash
 import requests
 import os
 from ...core.config import settings
-from ...agents.user_posts_feeds.post_feed_utils.post_feed_utils import get_all_posts_summary
+from ...core.feed_summaries import feed_summary_store, feed_summary_area
+from ...core.geocoding import reverse_geocoder
+from ...core.http_clients import http_clients
+from ...agents.user_posts_feeds.post_feed_utils.post_feed_utils import get_incremental_posts_summary
 
 from fastapi_utilities import ttl_lru_cache
 
@@ -96,14 +100,15 @@ def save_response_to_cache(cache_key: str, response_data: Dict) -> None:
     except Exception as e:
         print(f"Error saving response to cache: {str(e)}")
 
-def analyze_posts_for_insights(latitude: float, longitude: float, radius_km: float = 5.0) -> Dict:
+async def analyze_posts_for_insights(latitude: float, longitude: float, radius_km: float = 5.0) -> Dict:
     """
     Analyze posts in the given area to generate insights.
     Uses geohash-based queries for efficiency.
     """
     try:
-        # Get geohash cells for the area
-        geohash_cells = get_geohash_cells_for_radius(latitude, longitude, radius_km)
+        # Feed summaries are kept per area cell and radius, so collect around the cell centre
+        area_cell, center_lat, center_lng, radius_km = feed_summary_area(latitude, longitude, radius_km)
+        geohash_cells = get_geohash_cells_for_radius(center_lat, center_lng, radius_km)
         
         # Collect posts from all relevant geohash cells
         all_posts = []
@@ -119,47 +124,40 @@ def analyze_posts_for_insights(latitude: float, longitude: float, radius_km: flo
                     post_lat = post_data['location'].latitude
                     post_lon = post_data['location'].longitude
                     
-                    distance = calculate_distance(latitude, longitude, post_lat, post_lon)
+                    distance = calculate_distance(center_lat, center_lng, post_lat, post_lon)
                     if distance <= radius_km:
                         all_posts.append({
                             **post_data,
                             'distance': distance
                         })
         
-        return analyze_posts_data(all_posts, latitude, longitude)
+        return await analyze_posts_data(all_posts, latitude, longitude, area_cell, radius_km)
         
     except Exception as e:
         print(f"Error analyzing posts: {str(e)}")
         return generate_fallback_insights(latitude, longitude)
 
-def get_area_name_from_google_maps(latitude, longitude):
+async def get_area_name_from_google_maps(latitude, longitude):
+    fallback = f"Area at {latitude:.2f},{longitude:.2f}"
     api_key = settings.GOOGLE_MAPS_API_KEY
     if not api_key:
-        return f"Area at {latitude:.2f},{longitude:.2f}"
-    try:
-        url = (
-            f"https://maps.googleapis.com/maps/api/geocode/json"
-            f"?latlng={latitude},{longitude}&key={api_key}"
-        )
-        response = requests.get(url, timeout=3)
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("results"):
-                # Try to get a locality or neighborhood name
-                for component in data["results"][0].get("address_components", []):
-                    if "neighborhood" in component["types"]:
-                        return component["long_name"]
-                    if "locality" in component["types"]:
-                        return component["long_name"]
-                    if "sublocality" in component["types"]:
-                        return component["long_name"]
-                # Fallback to formatted address
-                return data["results"][0].get("formatted_address", f"Area at {latitude:.2f},{longitude:.2f}")
-    except Exception as e:
-        print(f"Error fetching area name from Google Maps: {e}")
-        return f"Area at {latitude:.2f},{longitude:.2f}"
+        return fallback
+    result = await reverse_geocoder.reverse_geocode(latitude, longitude, api_key)
+    if not result:
+        return fallback
+    # Try to get a locality or neighborhood name
+    for component in result.get("address_components", []):
+        if "neighborhood" in component["types"]:
+            return component["long_name"]
+        if "locality" in component["types"]:
+            return component["long_name"]
+        if "sublocality" in component["types"]:
+            return component["long_name"]
+    # Fallback to formatted address
+    return result.get("formatted_address", fallback)
 
-def analyze_posts_data(posts: List[Dict], latitude: float, longitude: float) -> Dict:
+async def analyze_posts_data(posts: List[Dict], latitude: float, longitude: float,
+                             area_cell: str, radius_km: float) -> Dict:
     """
     Analyze post data to generate insights.
     """
@@ -226,9 +224,17 @@ def analyze_posts_data(posts: List[Dict], latitude: float, longitude: float) ->
     
     # Generate area name using Google Maps Geocoding API based on coordinates
 
-    area_name = get_area_name_from_google_maps(latitude, longitude)
+    area_name = await get_area_name_from_google_maps(latitude, longitude)
     
-    feed_insights = get_all_posts_summary(gemini_model=GeminiAgent, all_posts=posts)
+    # Summarization calls Gemini synchronously; keep it off the event loop
+    feed_insights = await asyncio.to_thread(
+        get_incremental_posts_summary,
+        gemini_model=GeminiAgent, 
+        all_posts=posts, 
+        summary_store=feed_summary_store, 
+        area_cell=area_cell,
+        radius_km=radius_km
+    )
 
     return {
         "name": area_name,
@@ -311,7 +317,7 @@ async def get_area_insights(
             )
         
         # Analyze real post data for insights
-        insights_data = analyze_posts_for_insights(latitude, longitude, radius_km)
+        insights_data = await analyze_posts_for_insights(latitude, longitude, radius_km)
         
         # Convert to Area model
         insights = Area(**insights_data)
@@ -387,18 +393,15 @@ async def analyze_area_with_webhook(request: AreaAnalysisRequest):
         # Call external webhook API
         webhook_url = "https://donothackmyapi.duckdns.org/webhook-test/analyze-area"
         
-        import httpx
-
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                webhook_url,
-                json=payload,
-                headers={
-                    'Content-Type': 'application/json',
-                    'User-Agent': 'SynapCityApp/1.0'
-                },
-                timeout=None
-            )
+        response = await http_clients.httpx_client().post(
+            webhook_url,
+            json=payload,
+            headers={
+                'Content-Type': 'application/json',
+                'User-Agent': 'SynapCityApp/1.0'
+            },
+            timeout=None
+        )
         try:
             
             if response.status_code == 200:
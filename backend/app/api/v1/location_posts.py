@@ -186,7 +186,7 @@ async def get_route_between_locations(
     Get the route (directions) between two locations using the AI agent (Gemini).
     """
     try:
-        ai_output = GeminiAgent(
+        ai_output = await GeminiAgent.acall(
             task="route",
             origin={"latitude": route_req.origin.latitude, "longitude": route_req.origin.longitude},
             destination={"latitude": route_req.destination.latitude, "longitude": route_req.destination.longitude},
@@ -8,8 +8,10 @@ import asyncio
 from firebase_admin import firestore
 
 from ...agents.user_posts_feeds.gemini_model import GeminiAgent
+from ...core.gemini_governor import Priority
 from ...core.firebase import db
 from ...core.cache import cached_posts_endpoint, posts_cache_stats, clear_posts_cache
+from ...core.http_clients import http_clients
 from ...models.post import Post, PostCreate, PostUpdate, PostType, PostCategory
 from ...models.user import User
 from ..deps import get_current_active_user
@@ -69,10 +71,9 @@ async def report_high_upvote_post(post_data: dict, user_data: dict):
             "report_type": "HIGH_UPVOTE_ALERT"
         }
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(webhook_url, json=payload)
-            response.raise_for_status()
-            print(f"Successfully reported post {post_data.get('postId')} to webhook")
+        response = await http_clients.httpx_client().post(webhook_url, json=payload, timeout=10.0)
+        response.raise_for_status()
+        print(f"Successfully reported post {post_data.get('postId')} to webhook")
             
     except httpx.TimeoutException:
         print(f"Webhook timeout for post {post_data.get('postId', 'unknown')}")
@@ -130,7 +131,12 @@ async def create_post(
             "mentioned_location_name": None,
             "geohash": post_geohash,  # Add geohash for efficient queries
         }
-        gemini_output = GeminiAgent(task = "post_analysis", google_search = True, user_post_message = post_data["content"])
+        gemini_output = await GeminiAgent.acall(
+            task = "post_analysis", 
+            google_search = True, 
+            priority = Priority.INTERACTIVE, 
+            user_post_message = post_data["content"]
+        )
         if gemini_output['sentiment'].lower() == "vulgar":
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
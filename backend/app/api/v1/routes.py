@@ -1,15 +1,22 @@
 import uuid
 from fastapi import APIRouter, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, validator
 from typing import Optional, List, Any, Dict
 import httpx
 import asyncio
+import json
+import os
+import time
 from datetime import datetime
 import logging
 from enum import Enum
 
 # Add import for SynapCitySmartTrafficIntelligence
-from app.agents.route_intelligence.smart_route import SynapCitySmartTrafficIntelligence
+from app.agents.route_intelligence.smart_route import SynapCitySmartTrafficIntelligence, normalize_place
+from app.core.deadline import Deadline
+from app.core.gemini_governor import Priority
+from app.core.scheduler import RequestHeatTracker
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,8 +26,29 @@ router = APIRouter()
 
 # Configuration
 EXTERNAL_ROUTE_API_URL = "https://donothackmyapi.duckdns.org/webhook-test/7c01cf26-2b97-4599-b233-26584f8b26bf"
+# Overall budget for /best-route; sources still running are dropped to meet it
 REQUEST_TIMEOUT = 30
+# Retries for the Directions call the rest of the pipeline depends on
 MAX_RETRIES = 2
+# Autocomplete waits at most this long for Gemini capacity before using local results
+AUTOCOMPLETE_GEMINI_TIMEOUT = 3
+
+# Background precomputation of /best-route for hot origin/destination pairs
+ROUTE_PRECOMPUTE_INTERVAL_SECONDS = 300
+ROUTE_PRECOMPUTE_MAX_AGE_SECONDS = 2 * ROUTE_PRECOMPUTE_INTERVAL_SECONDS
+ROUTE_PRECOMPUTE_MAX_PAIRS = 10
+# Precomputed results are for leaving now; requests departing later are computed inline
+ROUTE_PRECOMPUTE_DEPARTURE_TOLERANCE_SECONDS = 900
+# Always-hot pairs: "origin|destination" entries separated by ";"
+HOT_ROUTE_PAIRS = os.getenv("HOT_ROUTE_PAIRS", "")
+
+# /departure-window: slots are window_minutes / step_minutes + 1 departures
+DEPARTURE_WINDOW_MAX_MINUTES = 240
+DEPARTURE_WINDOW_MAX_SLOTS = 25
+
+route_request_tracker = RequestHeatTracker(window_seconds=3600, max_keys=1000)
+# (normalized origin, normalized destination) -> {"insights": {...}, "computed_at": epoch seconds}
+precomputed_routes: Dict[tuple, Dict] = {}
 
 class IncidentType(str, Enum):
     ACCIDENT = "accident"
@@ -51,6 +79,13 @@ class RouteRequest(BaseModel):
             raise ValueError('Departure time must be positive')
         return v
 
+class DepartureWindowRequest(BaseModel):
+    origin: str = Field(..., min_length=3, max_length=200, description="Starting location")
+    destination: str = Field(..., min_length=3, max_length=200, description="Destination location")
+    window_start: Optional[int] = Field(None, ge=0, description="Earliest departure in milliseconds (default now)")
+    window_minutes: int = Field(60, ge=0, le=DEPARTURE_WINDOW_MAX_MINUTES, description="Length of the departure window")
+    step_minutes: int = Field(15, ge=5, le=60, description="Minutes between evaluated departures")
+
 # New API Response Models
 class JourneyInfo(BaseModel):
     origin: str
@@ -269,6 +304,78 @@ def create_alternatives(routes: List[RouteData], best_route_id: int) -> Alternat
     
     return alternatives
 
+def get_route_key(origin: str, destination: str) -> tuple:
+    """Key under which an origin/destination pair is tracked and precomputed"""
+    return (normalize_place(origin), normalize_place(destination))
+
+def get_configured_route_pairs() -> List[tuple]:
+    """(origin, destination) pairs listed in HOT_ROUTE_PAIRS"""
+    pairs = []
+    for entry in HOT_ROUTE_PAIRS.split(";"):
+        origin, _, destination = entry.partition("|")
+        if origin.strip() and destination.strip():
+            pairs.append((origin.strip(), destination.strip()))
+    return pairs
+
+def get_hot_route_pairs(limit: int = ROUTE_PRECOMPUTE_MAX_PAIRS) -> List[tuple]:
+    """
+    Hot pairs are the configured pairs followed by the most requested pairs of
+    the last hour.
+    """
+    hot_pairs = {}
+    for pair in get_configured_route_pairs():
+        hot_pairs.setdefault(get_route_key(*pair), pair)
+    for route_key, pair in route_request_tracker.hot_keys(limit=limit):
+        hot_pairs.setdefault(route_key, pair)
+    return list(hot_pairs.values())[:limit]
+
+def get_precomputed_route(origin: str, destination: str, departure_time: int) -> Optional[Dict]:
+    """
+    Return the background result for the pair if it is still fresh and the
+    request departs close enough to now, with its freshness in the metadata.
+    """
+    now = time.time()
+    if abs(departure_time / 1000 - now) > ROUTE_PRECOMPUTE_DEPARTURE_TOLERANCE_SECONDS:
+        return None
+    entry = precomputed_routes.get(get_route_key(origin, destination))
+    if not entry or now - entry["computed_at"] >= ROUTE_PRECOMPUTE_MAX_AGE_SECONDS:
+        return None
+    insights = entry["insights"]
+    return {
+        **insights,
+        'metadata': {
+            **insights.get('metadata', {}),
+            'precomputed': True,
+            'computed_at': datetime.fromtimestamp(entry["computed_at"]).isoformat(),
+            'age_seconds': round(now - entry["computed_at"])
+        }
+    }
+
+async def precompute_hot_routes():
+    """
+    Scheduled job: recompute route insights for hot pairs, one pair at a
+    time and in the governor's background lane, so that /best-route requests
+    for them are served without running the pipeline.
+    """
+    for origin, destination in get_hot_route_pairs():
+        try:
+            async with SynapCitySmartTrafficIntelligence(priority=Priority.BACKGROUND) as synap_city:
+                insights = await synap_city.get_per_route_insights(
+                    origin, destination, int(time.time() * 1000),
+                    deadline=Deadline(REQUEST_TIMEOUT), directions_retries=MAX_RETRIES
+                )
+            precomputed_routes[get_route_key(origin, destination)] = {
+                "insights": insights,
+                "computed_at": time.time(),
+            }
+        except Exception as e:
+            logger.error(f"Error precomputing route {origin} -> {destination}: {e}")
+
+    # Forget pairs that are no longer refreshed
+    for route_key in list(precomputed_routes):
+        if time.time() - precomputed_routes[route_key]["computed_at"] > ROUTE_PRECOMPUTE_MAX_AGE_SECONDS:
+            del precomputed_routes[route_key]
+
 @router.post("/best-route")
 async def get_best_route(data: RouteRequest):
     """Get the best route with comprehensive analysis using new API structure."""
@@ -278,12 +385,21 @@ async def get_best_route(data: RouteRequest):
     origin = data.origin.strip()
     destination = data.destination.strip()
     departure_time = data.departure_time or int(datetime.now().timestamp() * 1000)
+    route_request_tracker.record(get_route_key(origin, destination), (origin, destination))
+
+    # Hot pairs are served from the background precomputation
+    precomputed = get_precomputed_route(origin, destination, departure_time)
+    if precomputed is not None:
+        return precomputed
    
     try:
         # Use the intelligence engine as an async context manager
         async with SynapCitySmartTrafficIntelligence() as synap_city:
             # Fetch route insights from local intelligence engine
-            routes_with_insights = await synap_city.get_per_route_insights(origin, destination, departure_time)
+            routes_with_insights = await synap_city.get_per_route_insights(
+                origin, destination, departure_time,
+                deadline=Deadline(REQUEST_TIMEOUT), directions_retries=MAX_RETRIES
+            )
             from pprint import pprint
 
             # pprint(routes_with_insights)
@@ -459,6 +575,12 @@ async def get_best_route(data: RouteRequest):
             
     except HTTPException:
         raise
+    except asyncio.TimeoutError:
+        logger.error("Directions did not arrive within the request deadline")
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Timed out while fetching route data"
+        )
     except Exception as e:
         logger.error(f"Unexpected error in get_best_route: {e}")
         raise HTTPException(
@@ -466,6 +588,76 @@ async def get_best_route(data: RouteRequest):
             detail="Internal server error while processing route data"
         )
 
+@router.post("/best-route/stream")
+async def stream_best_route(data: RouteRequest):
+    """
+    Streaming variant of /best-route as NDJSON: route alternatives first, then
+    per-group intelligence as each group completes, then the fused insights.
+    """
+    request_id = f"req_{uuid.uuid4().hex[:8]}"
+    origin = data.origin.strip()
+    destination = data.destination.strip()
+    departure_time = data.departure_time or int(datetime.now().timestamp() * 1000)
+
+    async def events():
+        try:
+            async with SynapCitySmartTrafficIntelligence() as synap_city:
+                async for event in synap_city.stream_per_route_insights(
+                    origin, destination, departure_time,
+                    deadline=Deadline(REQUEST_TIMEOUT), directions_retries=MAX_RETRIES
+                ):
+                    yield json.dumps({'request_id': request_id, **event}, default=str) + "\n"
+        except Exception as e:
+            # Headers are already sent; report the failure in-band
+            logger.error(f"Unexpected error in stream_best_route: {e}")
+            yield json.dumps({
+                'request_id': request_id,
+                'event': 'error',
+                'detail': "Internal server error while processing route data"
+            }) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@router.post("/departure-window")
+async def get_departure_window(data: DepartureWindowRequest):
+    """
+    Rank departure times within a window. Directions and the static sources
+    are fetched once; each slot only re-evaluates time-dependent sources.
+    """
+    request_id = f"req_{uuid.uuid4().hex[:8]}"
+    origin = data.origin.strip()
+    destination = data.destination.strip()
+    window_start = data.window_start or int(datetime.now().timestamp() * 1000)
+    slot_count = data.window_minutes // data.step_minutes + 1
+    if slot_count > DEPARTURE_WINDOW_MAX_SLOTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Window covers {slot_count} departures; at most {DEPARTURE_WINDOW_MAX_SLOTS} are allowed"
+        )
+    departure_times = [window_start + i * data.step_minutes * 60 * 1000 for i in range(slot_count)]
+
+    try:
+        async with SynapCitySmartTrafficIntelligence() as synap_city:
+            sweep = await synap_city.sweep_departure_window(
+                origin, destination, departure_times,
+                deadline=Deadline(REQUEST_TIMEOUT), directions_retries=MAX_RETRIES
+            )
+        return {'request_id': request_id, **sweep}
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        logger.error("Directions did not arrive within the request deadline")
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Timed out while fetching route data"
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error in get_departure_window: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error while processing route data"
+        )
 
 def get_fallback_predictions(query: str) -> List[Dict]:
     """Fallback function to provide local search results when AI model is not available."""
@@ -566,7 +758,7 @@ async def test_gemini():
         gemini_model = GeminiModel(api_key=GEMINI_API_KEY)
         
         # Simple test
-        response = gemini_model(
+        response = await gemini_model.acall(
             task="location_prediction",
             user_input="test",
             max_results=1,
@@ -589,6 +781,7 @@ async def get_location_autocomplete(
         from app.agents.user_posts_feeds.gemini_model import GeminiModel
         from app.agents.user_posts_feeds.constants import GEMINI_API_KEY
         from app.agents.user_posts_feeds.post_feed_utils.prompt_creator import get_quick_matches
+        from app.core.gemini_governor import Priority, GeminiGovernorError
         
         # First, check for quick matches
         quick_match = get_quick_matches(query.lower(), "Bangalore")
@@ -666,11 +859,13 @@ async def get_location_autocomplete(
         # Use AI-based location prediction with optimized prompt
         try:
             logger.info(f"Calling AI model for query: {query}")
-            ai_response = gemini_model(
+            ai_response = await gemini_model.acall(
                 task="location_prediction",
                 user_input=query,
                 max_results=5,
-                city="Bangalore"
+                city="Bangalore",
+                priority=Priority.INTERACTIVE,
+                deadline=time.monotonic() + AUTOCOMPLETE_GEMINI_TIMEOUT
             )
             
             logger.info(f"AI response received: {ai_response}")
@@ -715,19 +910,18 @@ async def get_location_autocomplete(
             logger.info(f"Returning {len(filtered_predictions)} AI predictions")
             return {"predictions": filtered_predictions}
             
+        except GeminiGovernorError as governor_error:
+            # Quota exhausted or no capacity before the deadline: answer locally
+            logger.warning(f"Gemini unavailable ({governor_error}), falling back to local search")
+            fallback_results = get_fallback_predictions(query)
+            logger.info(f"Fallback returned {len(fallback_results)} results")
+            return {"predictions": fallback_results}
+            
         except Exception as ai_error:
             logger.error(f"AI-based location prediction failed: {ai_error}")
             logger.error(f"Error type: {type(ai_error)}")
             logger.error(f"Error details: {str(ai_error)}")
             
-            # Check if it's a quota error
-            if "429" in str(ai_error) or "RESOURCE_EXHAUSTED" in str(ai_error):
-                logger.warning("Gemini API quota exceeded, falling back to local search")
-                # Fallback to local search based on the query
-                fallback_results = get_fallback_predictions(query)
-                logger.info(f"Fallback returned {len(fallback_results)} results")
-                return {"predictions": fallback_results}
-            
             # For any other error, also try fallback
             logger.warning("AI model failed, trying fallback search")
             fallback_results = get_fallback_predictions(query)
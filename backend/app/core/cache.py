@@ -1,9 +1,12 @@
+import asyncio
 import functools
 import hashlib
 import json
 import sys
+import threading
 import time
-from typing import Any, Callable, Dict, Optional
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
 from functools import wraps
 import gc
 
@@ -103,6 +106,143 @@ class PostsCacheManager:
             del self._cache[key]
             del self._cache_times[key]
 
+_MISSING = object()
+
+
+class _InflightFetch:
+    """A shared fetch in progress and the number of callers awaiting it"""
+    __slots__ = ('future', 'task', 'waiters')
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+
+
+class TTLCache:
+    """
+    In-process LRU cache whose entries expire after ttl_seconds.
+    Used for short-lived upstream API data (route intelligence lookups).
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'coalesced': 0, 'abandoned': 0}
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, _InflightFetch] = {}
+        self._fetch_tasks: Set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or default if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.stats['misses'] += 1
+                return default
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a value; ttl_seconds overrides the cache default"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]],
+                           ttl_seconds: Optional[float] = None,
+                           should_cache: Callable[[Any], bool] = lambda value: True,
+                           metrics: Optional[Dict[str, int]] = None,
+                           flight_key: Optional[Hashable] = None) -> Any:
+        """
+        Return the cached value or await fetch() to produce it. Concurrent
+        callers for the same key share a single in-flight fetch (single-flight);
+        flight_key, if given, narrows who shares it (e.g. per priority lane)
+        while the result is still stored and looked up under key.
+        The fetch runs as its own task: a cancelled caller does not cancel it
+        for the others, but once every caller has gone it is cancelled too.
+        Values rejected by should_cache (e.g. empty error results) are returned
+        but not stored. metrics, if given, counts this caller's hits, misses
+        and coalesced waits (e.g. per request).
+        """
+        metrics = metrics if metrics is not None else {}
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            metrics['hits'] = metrics.get('hits', 0) + 1
+            return value
+
+        flight_key = key if flight_key is None else flight_key
+        inflight = self._inflight.get(flight_key)
+        if inflight is not None:
+            self.stats['coalesced'] += 1
+            metrics['coalesced'] = metrics.get('coalesced', 0) + 1
+            return await self._wait(flight_key, inflight)
+
+        metrics['misses'] = metrics.get('misses', 0) + 1
+
+        inflight = _InflightFetch(asyncio.get_running_loop().create_future())
+        self._inflight[flight_key] = inflight
+        inflight.task = asyncio.ensure_future(
+            self._fetch_into(key, flight_key, inflight, fetch, ttl_seconds, should_cache)
+        )
+        self._fetch_tasks.add(inflight.task)
+        inflight.task.add_done_callback(self._fetch_tasks.discard)
+        return await self._wait(flight_key, inflight)
+
+    async def _wait(self, flight_key: Hashable, inflight: _InflightFetch) -> Any:
+        inflight.waiters += 1
+        try:
+            return await asyncio.shield(inflight.future)
+        finally:
+            inflight.waiters -= 1
+            if inflight.waiters == 0 and not inflight.future.done():
+                # Nobody wants the result any more (e.g. a search cut off early)
+                self.stats['abandoned'] += 1
+                if self._inflight.get(flight_key) is inflight:
+                    del self._inflight[flight_key]
+                inflight.task.cancel()
+
+    async def _fetch_into(self, key: Hashable, flight_key: Hashable, inflight: _InflightFetch,
+                          fetch: Callable[[], Awaitable[Any]], ttl_seconds: Optional[float],
+                          should_cache: Callable[[Any], bool]):
+        future = inflight.future
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; avoid "never retrieved" warnings
+            return
+        finally:
+            if self._inflight.get(flight_key) is inflight:
+                del self._inflight[flight_key]
+        if should_cache(value):
+            self.set(key, value, ttl_seconds)
+        future.set_result(value)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
 # Global posts cache manager instance
 posts_cache_manager = PostsCacheManager(max_memory_mb=10, max_size=64)
 
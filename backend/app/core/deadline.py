@@ -0,0 +1,32 @@
+import time
+from typing import Optional
+
+
+class Deadline:
+    """
+    Absolute time budget for one request, passed down the pipeline so each
+    stage can size its own timeout from what is left. expires_at is a
+    time.monotonic() timestamp, the same clock the Gemini governor uses.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+    def timeout(self, budget: Optional[float] = None) -> float:
+        """Seconds a stage may take: its own budget, capped by what is left"""
+        remaining = self.remaining()
+        return remaining if budget is None else min(budget, remaining)
+
+    def reserve(self, seconds: float) -> "Deadline":
+        """Earlier deadline that leaves `seconds` for the stages that follow"""
+        child = Deadline.__new__(Deadline)
+        child.expires_at = max(time.monotonic(), self.expires_at - seconds)
+        child.seconds = max(0.0, self.seconds - seconds)
+        return child
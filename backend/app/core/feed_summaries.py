@@ -0,0 +1,81 @@
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+
+from google.cloud.firestore_v1 import FieldFilter
+
+from .firebase import db
+from ..utils.geohash_utils import decode_geohash, encode_geohash
+
+# Geohash precision of an area cell; matches the precision posts are stored with.
+FEED_SUMMARY_PRECISION = 6
+FEED_SUMMARY_COLLECTION = "feed_summaries"
+
+
+def feed_summary_area(latitude: float, longitude: float, radius_km: float) -> Tuple[str, float, float, float]:
+    """
+    (area cell, cell centre latitude, cell centre longitude, radius) for a
+    request. Posts are collected around the cell centre rather than the exact
+    request point so every request in the cell summarizes the same post set.
+    """
+    area_cell = encode_geohash(latitude, longitude, FEED_SUMMARY_PRECISION)
+    center_lat, center_lng = (float(v) for v in decode_geohash(area_cell))
+    return area_cell, center_lat, center_lng, round(radius_km, 1)
+
+
+class FeedSummaryStore:
+    """
+    Persists feed summaries per (area cell, radius, category).
+
+    Each stored summary keeps the IDs of the posts it covers in `related_feeds`,
+    which lets the summarizer feed only newly added posts to the LLM on the next
+    request. Falls back to process memory when Firestore is not configured.
+    """
+
+    def __init__(self, collection: str = FEED_SUMMARY_COLLECTION):
+        self.collection = collection
+        self._memory: Dict[str, Dict[str, Dict]] = {}
+
+    def _doc_id(self, area_cell: str, radius_km: float, category: str) -> str:
+        return f"{area_cell}_{radius_km:g}km_{category}"
+
+    def load(self, area_cell: str, radius_km: float) -> Dict[str, Dict]:
+        """Return the stored summaries of an area cell and radius keyed by category"""
+        if db is None:
+            return dict(self._memory.get((area_cell, radius_km), {}))
+
+        summaries = {}
+        try:
+            query = (db.collection(self.collection)
+                     .where(filter=FieldFilter('areaCell', '==', area_cell))
+                     .where(filter=FieldFilter('radiusKm', '==', radius_km)))
+            for doc in query.stream():
+                data = doc.to_dict()
+                summaries[data['category']] = data['summary']
+        except Exception as e:
+            print(f"Error loading feed summaries for {area_cell}: {str(e)}")
+        return summaries
+
+    def save(self, area_cell: str, radius_km: float, summaries: Dict[str, Dict]) -> None:
+        """Store (or replace) the given category summaries of an area cell and radius"""
+        if db is None:
+            self._memory.setdefault((area_cell, radius_km), {}).update(summaries)
+            return
+
+        try:
+            batch = db.batch()
+            for category, summary in summaries.items():
+                doc_ref = db.collection(self.collection).document(self._doc_id(area_cell, radius_km, category))
+                batch.set(doc_ref, {
+                    'areaCell': area_cell,
+                    'radiusKm': radius_km,
+                    'category': category,
+                    'summary': summary,
+                    'updatedAt': datetime.now(timezone.utc),
+                })
+            batch.commit()
+        except Exception as e:
+            print(f"Error saving feed summaries for {area_cell}: {str(e)}")
+
+
+# Global feed summary store instance
+feed_summary_store = FeedSummaryStore()
@@ -0,0 +1,235 @@
+"""
+Central governor for Gemini API calls.
+
+Every Gemini request in the backend (moderation, autocomplete, feed summaries,
+route fusion, traffic analysis) goes through one process-wide governor that
+enforces requests-per-minute and tokens-per-minute budgets, admits waiting
+callers by priority lane, gives up on callers whose deadline passes while
+queued, and backs off adaptively when Gemini answers with 429.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from enum import IntEnum
+from typing import Any, Callable, Optional
+
+from .rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "300"))
+GEMINI_TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+# Tokens reserved for the model's answer on top of the estimated prompt size
+DEFAULT_OUTPUT_TOKENS = 1024
+MAX_RATE_LIMIT_RETRIES = 3
+MAX_BACKOFF_SECONDS = 60.0
+# Upper bound on a single sleep so waiters notice priority changes and deadlines
+POLL_INTERVAL_SECONDS = 0.25
+
+
+class Priority(IntEnum):
+    """Priority lanes; lower values are admitted first"""
+    INTERACTIVE = 0  # user is waiting on the answer (moderation, autocomplete)
+    STANDARD = 1     # request-path analysis (route fusion, traffic analysis)
+    BACKGROUND = 2   # work that can wait (feed summaries, precomputation)
+
+
+# How long a call may wait in the queue when the caller gives no deadline
+DEFAULT_QUEUE_TIMEOUT_SECONDS = {
+    Priority.INTERACTIVE: 10.0,
+    Priority.STANDARD: 30.0,
+    Priority.BACKGROUND: 120.0,
+}
+
+
+class GeminiGovernorError(Exception):
+    """Base class for calls rejected by the governor"""
+
+
+class GeminiQuotaExceeded(GeminiGovernorError):
+    """Gemini kept answering 429 / RESOURCE_EXHAUSTED after backing off"""
+
+
+class GeminiDeadlineExceeded(GeminiGovernorError):
+    """The call could not be admitted before its deadline"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for a prompt (Gemini averages ~4 chars per token)"""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True if the exception is Gemini reporting an exhausted quota"""
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    message = str(error)
+    return "RESOURCE_EXHAUSTED" in message or message.startswith("429")
+
+
+class GeminiGovernor:
+    def __init__(self, requests_per_minute: int = GEMINI_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = GEMINI_TOKENS_PER_MINUTE):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._request_bucket = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self._token_bucket = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self._lock = threading.Lock()
+        self._queue = []  # heap of (priority, sequence)
+        self._abandoned = set()
+        self._sequence = itertools.count()
+        self._rate_scale = 1.0
+        self._backoff_seconds = 0.0
+        self._backoff_until = 0.0
+        self.stats = {
+            'admitted': 0,
+            'rate_limited': 0,
+            'deadline_exceeded': 0,
+            'quota_exceeded': 0,
+        }
+
+    def _enqueue(self, priority: Priority) -> tuple:
+        ticket = (int(priority), next(self._sequence))
+        with self._lock:
+            heapq.heappush(self._queue, ticket)
+        return ticket
+
+    def _abandon(self, ticket: tuple):
+        with self._lock:
+            self._abandoned.add(ticket)
+            self._drop_abandoned()
+
+    def _drop_abandoned(self):
+        while self._queue and self._queue[0] in self._abandoned:
+            self._abandoned.discard(heapq.heappop(self._queue))
+
+    def _try_admit(self, ticket: tuple, tokens: int) -> float:
+        """Admit the ticket and return 0, or return how long to wait before retrying"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._backoff_until:
+                return self._backoff_until - now
+            self._drop_abandoned()
+            if self._queue[0] != ticket:
+                # A higher priority (or older) caller goes first
+                return POLL_INTERVAL_SECONDS
+            wait = max(
+                self._request_bucket.time_until_available(1),
+                self._token_bucket.time_until_available(tokens)
+            )
+            if wait > 0:
+                return wait
+            self._request_bucket.try_consume(1)
+            self._token_bucket.try_consume(tokens)
+            heapq.heappop(self._queue)
+            self.stats['admitted'] += 1
+            return 0.0
+
+    def _resolve_deadline(self, priority: Priority, deadline: Optional[float]) -> float:
+        if deadline is not None:
+            return deadline
+        return time.monotonic() + DEFAULT_QUEUE_TIMEOUT_SECONDS[priority]
+
+    def _acquire(self, priority: Priority, tokens: int, deadline: float):
+        ticket = self._enqueue(priority)
+        try:
+            while True:
+                wait = self._try_admit(ticket, tokens)
+                if wait == 0:
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait == float('inf'):
+                    self.stats['deadline_exceeded'] += 1
+                    raise GeminiDeadlineExceeded("Gemini call not admitted before its deadline")
+                time.sleep(min(wait, remaining, POLL_INTERVAL_SECONDS))
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+    async def _acquire_async(self, priority: Priority, tokens: int, deadline: float):
+        ticket = self._enqueue(priority)
+        try:
+            while True:
+                wait = self._try_admit(ticket, tokens)
+                if wait == 0:
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait == float('inf'):
+                    self.stats['deadline_exceeded'] += 1
+                    raise GeminiDeadlineExceeded("Gemini call not admitted before its deadline")
+                await asyncio.sleep(min(wait, remaining, POLL_INTERVAL_SECONDS))
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+    def _on_rate_limited(self):
+        """Multiplicative decrease: pause everyone and halve the request rate"""
+        with self._lock:
+            self.stats['rate_limited'] += 1
+            self._backoff_seconds = min(MAX_BACKOFF_SECONDS, max(1.0, self._backoff_seconds * 2))
+            self._backoff_until = time.monotonic() + self._backoff_seconds * random.uniform(1.0, 1.5)
+            self._rate_scale = max(0.1, self._rate_scale / 2)
+            self._request_bucket.set_rate(self.requests_per_minute * self._rate_scale / 60)
+        logger.warning(f"Gemini rate limited; backing off {self._backoff_seconds:.1f}s, "
+                       f"rate scaled to {self._rate_scale:.2f}")
+
+    def _on_success(self):
+        """Additive increase back towards the configured request rate"""
+        if self._rate_scale >= 1.0 and self._backoff_seconds == 0:
+            return
+        with self._lock:
+            self._backoff_seconds = 0.0
+            self._rate_scale = min(1.0, self._rate_scale + 0.05)
+            self._request_bucket.set_rate(self.requests_per_minute * self._rate_scale / 60)
+
+    def _check_retry(self, error: Exception, attempt: int, deadline: float):
+        if not is_rate_limit_error(error):
+            raise error
+        self._on_rate_limited()
+        if attempt >= MAX_RATE_LIMIT_RETRIES or time.monotonic() >= deadline:
+            self.stats['quota_exceeded'] += 1
+            raise GeminiQuotaExceeded(f"Gemini quota exhausted: {error}") from error
+
+    def call(self, func: Callable[..., Any], *args, priority: Priority = Priority.STANDARD,
+             estimated_tokens: int = DEFAULT_OUTPUT_TOKENS, deadline: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run a blocking Gemini call once the governor admits it.
+
+        deadline is an absolute time.monotonic() timestamp; calls still queued
+        when it passes raise GeminiDeadlineExceeded.
+        """
+        deadline = self._resolve_deadline(priority, deadline)
+        for attempt in itertools.count(1):
+            self._acquire(priority, estimated_tokens, deadline)
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self._check_retry(e, attempt, deadline)
+                continue
+            self._on_success()
+            return result
+
+    async def acall(self, func: Callable[..., Any], *args, priority: Priority = Priority.STANDARD,
+                    estimated_tokens: int = DEFAULT_OUTPUT_TOKENS, deadline: Optional[float] = None, **kwargs) -> Any:
+        """Async counterpart of call() for coroutine functions such as client.aio.models.generate_content"""
+        deadline = self._resolve_deadline(priority, deadline)
+        for attempt in itertools.count(1):
+            await self._acquire_async(priority, estimated_tokens, deadline)
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                self._check_retry(e, attempt, deadline)
+                continue
+            self._on_success()
+            return result
+
+
+# Global governor shared by every Gemini client in the process
+gemini_governor = GeminiGovernor()
@@ -0,0 +1,207 @@
+"""
+Shared reverse-geocoding service.
+
+Route intelligence, area insights and the post pipeline all turn coordinates
+into addresses. Results are keyed by the geohash cell of the coordinates, kept
+in memory and in a sqlite file under backend/cache so they survive restarts,
+and failures are cached briefly so a bad cell is not retried on every request.
+Concurrent lookups of the same cell share one Google Geocoding call.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import aiohttp
+
+from .cache import TTLCache
+from .http_clients import http_clients
+from ..utils.geohash_utils import decode_geohash, encode_geohash
+
+# Geohash precision of a cache cell (7 ~ 150m, 6 ~ 1.2km)
+REVERSE_GEOCODE_PRECISION = int(os.getenv("REVERSE_GEOCODE_PRECISION", "7"))
+REVERSE_GEOCODE_DB_PATH = os.getenv(
+    "REVERSE_GEOCODE_DB_PATH",
+    os.path.join(os.path.dirname(__file__), '../../cache/reverse_geocode.sqlite3')
+)
+POSITIVE_TTL_SECONDS = 30 * 24 * 3600
+NEGATIVE_TTL_SECONDS = 600
+MEMORY_CACHE_SIZE = 10000
+GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+REQUEST_TIMEOUT_SECONDS = 5
+
+
+class ReverseGeocodeStore:
+    """sqlite backing store: one row per geohash cell, NULL result = negative entry"""
+
+    def __init__(self, path: str = REVERSE_GEOCODE_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS reverse_geocode ("
+                "geohash TEXT PRIMARY KEY, result TEXT, expires_at REAL NOT NULL)"
+            )
+            self._connection.commit()
+        return self._connection
+
+    def get(self, geohash: str) -> Optional[tuple]:
+        """Return (result, seconds_left) or None; result is None for a cached failure"""
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT result, expires_at FROM reverse_geocode WHERE geohash = ?", (geohash,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading reverse geocode cache: {e}")
+            return None
+        if row is None or row[1] <= time.time():
+            return None
+        return (json.loads(row[0]) if row[0] is not None else None), row[1] - time.time()
+
+    def set(self, geohash: str, result: Optional[Dict], ttl_seconds: float):
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute(
+                    "INSERT OR REPLACE INTO reverse_geocode (geohash, result, expires_at) VALUES (?, ?, ?)",
+                    (geohash, json.dumps(result) if result is not None else None, time.time() + ttl_seconds)
+                )
+                connection.commit()
+        except sqlite3.Error as e:
+            print(f"Error writing reverse geocode cache: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class ReverseGeocoder:
+    """
+    Reverse geocoding keyed by geohash cell. Returns the first Google Geocoding
+    result (address_components, formatted_address, ...) for the cell centre,
+    or None when the lookup failed or found nothing.
+    """
+
+    def __init__(self, precision: int = REVERSE_GEOCODE_PRECISION,
+                 store: Optional[ReverseGeocodeStore] = None):
+        self.precision = precision
+        self.store = store or ReverseGeocodeStore()
+        self._memory = TTLCache(max_size=MEMORY_CACHE_SIZE, ttl_seconds=POSITIVE_TTL_SECONDS)
+        self._sync_inflight: Dict[str, threading.Event] = {}
+        self._sync_lock = threading.Lock()
+        self.stats = {'api_calls': 0, 'failures': 0}
+
+    def cell_for(self, lat: float, lng: float) -> str:
+        return encode_geohash(lat, lng, self.precision)
+
+    def _cached(self, cell: str) -> Optional[tuple]:
+        """(result,) from memory, then sqlite; None if the cell is not cached"""
+        entry = self._memory.get(cell)
+        if entry is not None:
+            return entry
+        return self._load(cell)
+
+    def _load(self, cell: str) -> Optional[tuple]:
+        stored = self.store.get(cell)
+        if stored is None:
+            return None
+        result, seconds_left = stored
+        self._memory.set(cell, (result,), seconds_left)
+        return (result,)
+
+    def _remember(self, cell: str, result: Optional[Dict]) -> tuple:
+        ttl = POSITIVE_TTL_SECONDS if result is not None else NEGATIVE_TTL_SECONDS
+        self._memory.set(cell, (result,), ttl)
+        self.store.set(cell, result, ttl)
+        return (result,)
+
+    async def _load_or_fetch(self, cell: str, api_key: str) -> tuple:
+        entry = await asyncio.to_thread(self._load, cell)
+        if entry is not None:
+            return entry
+
+        lat, lng = (float(v) for v in decode_geohash(cell))
+        self.stats['api_calls'] += 1
+        try:
+            params = {'latlng': f"{lat},{lng}", 'key': api_key}
+            session = http_clients.session('google_maps')
+            timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT_SECONDS)
+            async with session.get(GEOCODE_URL, params=params, timeout=timeout) as response:
+                response.raise_for_status()
+                results = (await response.json()).get('results', [])
+                result = results[0] if results else None
+        except Exception as e:
+            print(f"Error reverse geocoding {cell}: {e}")
+            self.stats['failures'] += 1
+            result = None
+        return await asyncio.to_thread(self._remember, cell, result)
+
+    async def reverse_geocode(self, lat: float, lng: float, api_key: Optional[str] = None) -> Optional[Dict]:
+        """First geocoding result for the cell containing (lat, lng)"""
+        api_key = api_key or os.getenv("GOOGLE_MAPS_API_KEY")
+        if not api_key:
+            return None
+        cell = self.cell_for(lat, lng)
+        # Memory hit, or one shared sqlite/API lookup for all concurrent callers;
+        # _remember stores the entry with its positive or negative TTL.
+        entry = await self._memory.get_or_fetch(
+            cell,
+            lambda: self._load_or_fetch(cell, api_key),
+            should_cache=lambda entry: False
+        )
+        return entry[0]
+
+    def reverse_geocode_sync(self, lat: float, lng: float,
+                             fetch: Callable[[float, float], Any]) -> Optional[Dict]:
+        """
+        Blocking variant for synchronous callers that bring their own client.
+        fetch(lat, lng) returns a list of geocoding results; concurrent threads
+        asking for the same cell wait for the first one.
+        """
+        cell = self.cell_for(lat, lng)
+        while True:
+            entry = self._cached(cell)
+            if entry is not None:
+                return entry[0]
+            with self._sync_lock:
+                event = self._sync_inflight.get(cell)
+                owner = event is None
+                if owner:
+                    event = self._sync_inflight[cell] = threading.Event()
+            if not owner:
+                event.wait(REQUEST_TIMEOUT_SECONDS)
+                continue
+            try:
+                cell_lat, cell_lng = (float(v) for v in decode_geohash(cell))
+                self.stats['api_calls'] += 1
+                try:
+                    results = fetch(cell_lat, cell_lng)
+                    result = results[0] if results else None
+                except Exception as e:
+                    print(f"Error reverse geocoding {cell}: {e}")
+                    self.stats['failures'] += 1
+                    result = None
+                return self._remember(cell, result)[0]
+            finally:
+                with self._sync_lock:
+                    self._sync_inflight.pop(cell, None)
+                event.set()
+
+    def close(self):
+        self.store.close()
+
+
+# Global reverse geocoder shared by routes, insights and the post pipeline
+reverse_geocoder = ReverseGeocoder()
@@ -0,0 +1,94 @@
+"""
+Application-wide pooled HTTP clients.
+
+Outbound calls share long-lived clients instead of opening a session (and a
+TLS handshake) per request. aiohttp sessions are kept per upstream service so
+each gets its own per-host connection limits and default timeout; all of them
+cache DNS lookups and keep connections alive. Clients are created lazily on
+first use and closed from the FastAPI lifespan.
+"""
+
+from typing import Dict, Optional
+
+import aiohttp
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+DNS_CACHE_TTL_SECONDS = 300
+KEEPALIVE_SECONDS = 30
+DEFAULT_TIMEOUT_SECONDS = 10
+
+# service -> (total timeout seconds, max connections per host)
+SERVICE_SETTINGS = {
+    'google_maps': (10, 20),
+    'tomtom': (10, 20),
+    'openweather': (10, 10),
+    'web_search': (10, 10),
+    # Arbitrary news/social sites fetched for verification and scraping
+    'scrape': (10, 4),
+}
+
+
+class HTTPClientRegistry:
+    def __init__(self):
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._httpx_client: Optional[httpx.AsyncClient] = None
+        self._requests_session: Optional[requests.Session] = None
+
+    def session(self, service: str) -> aiohttp.ClientSession:
+        """Shared aiohttp session for an upstream service (created on the running loop)"""
+        session = self._sessions.get(service)
+        if session is None or session.closed:
+            timeout, limit_per_host = SERVICE_SETTINGS.get(service, (DEFAULT_TIMEOUT_SECONDS, 10))
+            session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=timeout),
+                connector=aiohttp.TCPConnector(
+                    limit=100,
+                    limit_per_host=limit_per_host,
+                    ttl_dns_cache=DNS_CACHE_TTL_SECONDS,
+                    keepalive_timeout=KEEPALIVE_SECONDS
+                )
+            )
+            self._sessions[service] = session
+        return session
+
+    def httpx_client(self) -> httpx.AsyncClient:
+        """Shared httpx client for webhook calls"""
+        if self._httpx_client is None or self._httpx_client.is_closed:
+            self._httpx_client = httpx.AsyncClient(
+                timeout=DEFAULT_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=50,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=KEEPALIVE_SECONDS
+                )
+            )
+        return self._httpx_client
+
+    def requests_session(self) -> requests.Session:
+        """Shared blocking session for code that runs in worker threads"""
+        if self._requests_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._requests_session = session
+        return self._requests_session
+
+    async def close(self):
+        """Close every client; called on application shutdown"""
+        for session in self._sessions.values():
+            if not session.closed:
+                await session.close()
+        self._sessions.clear()
+        if self._httpx_client is not None:
+            await self._httpx_client.aclose()
+            self._httpx_client = None
+        if self._requests_session is not None:
+            self._requests_session.close()
+            self._requests_session = None
+
+
+# Global HTTP client registry
+http_clients = HTTPClientRegistry()
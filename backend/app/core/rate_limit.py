@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Holds up to `capacity` tokens and refills at
+    `refill_per_second`; callers either consume immediately or learn how long
+    they have to wait.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated_at
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_per_second)
+        self._updated_at = now
+
+    def set_rate(self, refill_per_second: float):
+        """Change the refill rate (used for adaptive throttling)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.refill_per_second = refill_per_second
+
+    def time_until_available(self, amount: float = 1.0) -> float:
+        """Seconds until `amount` tokens can be consumed (0 if available now)"""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            missing = amount - self._tokens
+            if missing <= 0:
+                return 0.0
+            if self.refill_per_second <= 0:
+                return float('inf')
+            return missing / self.refill_per_second
+
+    def try_consume(self, amount: float = 1.0) -> bool:
+        """Consume `amount` tokens if they are available right now"""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return True
+            return False
+
+    def acquire(self, amount: float = 1.0):
+        """Block the calling thread until `amount` tokens are consumed"""
+        while not self.try_consume(amount):
+            time.sleep(min(self.time_until_available(amount), 1.0))
+
+    async def acquire_async(self, amount: float = 1.0):
+        """Wait on the event loop until `amount` tokens are consumed"""
+        while not self.try_consume(amount):
+            await asyncio.sleep(min(self.time_until_available(amount), 1.0))
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundScheduler:
+    """
+    Minimal in-process scheduler that runs coroutine jobs periodically on the
+    application event loop. Started and stopped from the FastAPI lifespan; every
+    worker process runs its own copy of the jobs.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, Tuple[Callable[[], Awaitable[Any]], float, float]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def add_job(self, name: str, func: Callable[[], Awaitable[Any]],
+                interval_seconds: float, initial_delay_seconds: float = 0.0):
+        """Register a coroutine function to run every interval_seconds"""
+        self._jobs[name] = (func, interval_seconds, initial_delay_seconds)
+        if self._tasks and name not in self._tasks:
+            self._tasks[name] = asyncio.create_task(self._run_job(name))
+
+    async def _run_job(self, name: str):
+        func, interval_seconds, initial_delay_seconds = self._jobs[name]
+        await asyncio.sleep(initial_delay_seconds)
+        while True:
+            started = time.monotonic()
+            try:
+                await func()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scheduled job {name} failed: {e}")
+            elapsed = time.monotonic() - started
+            await asyncio.sleep(max(0.0, interval_seconds - elapsed))
+
+    def start(self):
+        """Start all registered jobs on the running event loop"""
+        for name in self._jobs:
+            if name not in self._tasks:
+                self._tasks[name] = asyncio.create_task(self._run_job(name))
+
+    async def stop(self):
+        """Cancel all running jobs and wait for them to finish"""
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class RequestHeatTracker:
+    """
+    Tracks how often keys (areas, routes, ...) were requested within a sliding
+    window so background jobs can focus on the hottest ones. Safe to use from
+    the event loop and from worker threads at the same time.
+    """
+
+    def __init__(self, window_seconds: float = 3600, max_keys: int = 1000):
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._hits: Dict[Hashable, Deque[float]] = {}
+        self._payloads: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        cutoff = now - self.window_seconds
+        for key in list(self._hits):
+            hits = self._hits[key]
+            while hits and hits[0] < cutoff:
+                hits.popleft()
+            if not hits:
+                del self._hits[key]
+                self._payloads.pop(key, None)
+
+    def record(self, key: Hashable, payload: Any = None):
+        """Record one request for key; payload keeps whatever is needed to recompute it"""
+        now = time.time()
+        with self._lock:
+            if key not in self._hits and len(self._hits) >= self.max_keys:
+                self._prune(now)
+                if len(self._hits) >= self.max_keys:
+                    # Drop the key that was requested least recently
+                    oldest_key = min(self._hits, key=lambda k: self._hits[k][-1])
+                    del self._hits[oldest_key]
+                    self._payloads.pop(oldest_key, None)
+            self._hits.setdefault(key, deque()).append(now)
+            self._payloads[key] = payload
+
+    def hot_keys(self, limit: int = 20, min_hits: int = 2) -> List[Tuple[Hashable, Any]]:
+        """Return up to limit (key, payload) pairs with at least min_hits recent requests"""
+        with self._lock:
+            self._prune(time.time())
+            ranked = sorted(
+                (key for key, hits in self._hits.items() if len(hits) >= min_hits),
+                key=lambda k: len(self._hits[k]),
+                reverse=True
+            )
+            return [(key, self._payloads[key]) for key in ranked[:limit]]
+
+
+# Global scheduler instance, started by the application lifespan
+scheduler = BackgroundScheduler()
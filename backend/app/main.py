@@ -3,12 +3,40 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 import os
+from contextlib import asynccontextmanager
 from .core.config import settings
+from .core.scheduler import scheduler
+from .core.geocoding import reverse_geocoder
+from .core.http_clients import http_clients
 from .api.v1 import api_router
+from .api.v1.dashboard import precompute_hot_area_activities, FEED_PRECOMPUTE_INTERVAL_SECONDS
+from .api.v1.routes import precompute_hot_routes, ROUTE_PRECOMPUTE_INTERVAL_SECONDS
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background jobs run in-process on the application event loop
+    scheduler.add_job(
+        "precompute_hot_area_activities",
+        precompute_hot_area_activities,
+        interval_seconds=FEED_PRECOMPUTE_INTERVAL_SECONDS,
+        initial_delay_seconds=30
+    )
+    scheduler.add_job(
+        "precompute_hot_routes",
+        precompute_hot_routes,
+        interval_seconds=ROUTE_PRECOMPUTE_INTERVAL_SECONDS,
+        initial_delay_seconds=60
+    )
+    scheduler.start()
+    yield
+    await scheduler.stop()
+    reverse_geocoder.close()
+    await http_clients.close()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # Set up CORS
@@ -0,0 +1,142 @@
+"""
+Helpers for turning LLM responses into JSON objects.
+
+Gemini answers either with pure JSON (JSON MIME / structured-output mode) or
+with prose and code fences around a JSON object. `extract_json` handles both:
+it decodes pure JSON directly, then tries each ```json or untagged fenced
+block, and otherwise scans the whole text once for balanced top-level
+objects, skipping braces that appear inside JSON strings.
+"""
+
+import json
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import orjson
+
+    def _loads(text: str) -> Any:
+        return orjson.loads(text)
+except ImportError:
+    _loads = json.loads
+
+
+class LLMJSONError(ValueError):
+    """Raised when no JSON object can be extracted from an LLM response"""
+
+
+JSON_FENCE_LANGUAGES = ("", "json", "json5", "jsonc")
+
+
+def iter_code_blocks(text: str) -> Iterator[str]:
+    """
+    Yield the bodies of ``` fenced blocks tagged json or untagged, in order.
+    Blocks in other languages (e.g. python dict literals) are skipped.
+    """
+    start = text.find("```")
+    while start != -1:
+        body_start = text.find("\n", start)
+        if body_start == -1:
+            return
+        language = text[start + 3:body_start].strip().lower()
+        end = text.find("```", body_start)
+        # An unterminated fence keeps everything after the opening line
+        body = text[body_start + 1:] if end == -1 else text[body_start + 1:end]
+        if language in JSON_FENCE_LANGUAGES and "{" in body:
+            yield body
+        if end == -1:
+            return
+        start = text.find("```", end + 3)
+
+
+def iter_json_objects(text: str) -> Iterator[str]:
+    """
+    Yield every balanced top-level {...} span of text in a single pass.
+    Quotes are only tracked inside objects, so apostrophes and quotes in
+    surrounding prose do not confuse the scanner.
+    """
+    depth = 0
+    start = -1
+    in_string = False
+    escaped = False
+    for index, char in enumerate(text):
+        if depth == 0:
+            if char == "{":
+                depth = 1
+                start = index
+            continue
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                yield text[start:index + 1]
+
+
+def extract_json(text: Optional[str]) -> Dict[str, Any]:
+    """Extract the first JSON object from an LLM response"""
+    if not text:
+        raise LLMJSONError("Empty LLM response")
+
+    # Fenced blocks first; a block without a valid object falls through to the next
+    for body in (*iter_code_blocks(text), text):
+        result = _first_object(body.strip())
+        if result is not None:
+            return result
+    raise LLMJSONError("No JSON object found in LLM response")
+
+
+def _first_object(body: str) -> Optional[Dict[str, Any]]:
+    if body.startswith("{"):
+        try:
+            result = _loads(body)
+            if isinstance(result, dict):
+                return result
+        except ValueError:
+            pass
+
+    for candidate in iter_json_objects(body):
+        try:
+            result = _loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(result, dict):
+            return result
+    return None
+
+
+def parse_gemini_response(response: Any) -> Dict[str, Any]:
+    """
+    Return the JSON payload of a Gemini response. Uses the SDK-parsed value
+    when a response schema was requested and falls back to the response text.
+    """
+    parsed = getattr(response, "parsed", None)
+    if isinstance(parsed, dict):
+        return parsed
+    if parsed is not None and hasattr(parsed, "model_dump"):
+        return parsed.model_dump()
+    return extract_json(getattr(response, "text", None))
+
+
+def json_generation_config(response_schema: Any = None, timeout_seconds: Optional[float] = None, **kwargs):
+    """
+    GenerateContentConfig that puts Gemini in JSON MIME mode (optionally with a
+    structured-output schema). Not combinable with the Google Search tool.
+    timeout_seconds bounds the HTTP request itself.
+    """
+    from google.genai import types
+    if timeout_seconds is not None:
+        kwargs['http_options'] = types.HttpOptions(timeout=max(1, int(timeout_seconds * 1000)))
+    return types.GenerateContentConfig(
+        response_mime_type="application/json",
+        response_schema=response_schema,
+        **kwargs
+    )
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark for route segment grouping.
+
+Compares the previous greedy pairwise grouping with the grid-indexed
+group_points() used by nearby_segments_combiner on synthetic long routes
+(several alternatives with hundreds of steps each), and checks that the
+grid version produces the same groups regardless of step order.
+
+Usage: python scripts/benchmark_segment_grouping.py [--steps 400] [--routes 3]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+
+from app.agents.route_intelligence.route_utils import calculate_haversine_distance
+from app.agents.route_intelligence.segment_grouping import group_points, DEFAULT_GROUP_RADIUS_M
+
+
+def greedy_grouping(lats, lngs, radius_m):
+    """Previous O(n^2) grouping: each unprocessed point absorbs everything within radius"""
+    processed = [False] * len(lats)
+    groups = []
+    for index in range(len(lats)):
+        if processed[index]:
+            continue
+        processed[index] = True
+        members = [index]
+        for other in range(index + 1, len(lats)):
+            if processed[other]:
+                continue
+            if calculate_haversine_distance(lats[index], lngs[index], lats[other], lngs[other]) <= radius_m:
+                members.append(other)
+                processed[other] = True
+        groups.append(members)
+    return groups
+
+
+def synthetic_routes(num_routes, steps_per_route, seed=7):
+    """Alternatives between two far-apart points, wiggling around the straight line"""
+    rng = random.Random(seed)
+    start_lat, start_lng = 12.9716, 77.5946   # Bangalore
+    end_lat, end_lng = 17.3850, 78.4867       # Hyderabad
+    lats, lngs = [], []
+    for route in range(num_routes):
+        offset = (route - num_routes / 2) * 0.05
+        for step in range(steps_per_route):
+            t = step / max(1, steps_per_route - 1)
+            wiggle = 0.08 * math.sin(t * math.pi * 6 + route)
+            lats.append(start_lat + (end_lat - start_lat) * t + offset + rng.uniform(-0.01, 0.01))
+            lngs.append(start_lng + (end_lng - start_lng) * t + wiggle + rng.uniform(-0.01, 0.01))
+    return lats, lngs
+
+
+def time_call(func, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--steps", type=int, default=400, help="steps per route")
+    parser.add_argument("--routes", type=int, default=3, help="number of alternative routes")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'points':>8} {'greedy ms':>10} {'grid ms':>10} {'speedup':>8} {'greedy groups':>14} {'grid groups':>12}")
+    for steps in sorted({args.steps // 4, args.steps // 2, args.steps, args.steps * 2}):
+        lats, lngs = synthetic_routes(args.routes, steps)
+        lat_array, lng_array = np.array(lats), np.array(lngs)
+
+        greedy_time, greedy_groups = time_call(
+            lambda: greedy_grouping(lats, lngs, DEFAULT_GROUP_RADIUS_M), args.repeat)
+        grid_time, grid_groups = time_call(
+            lambda: group_points(lat_array, lng_array, DEFAULT_GROUP_RADIUS_M), args.repeat)
+
+        print(f"{len(lats):>8} {greedy_time * 1000:>10.1f} {grid_time * 1000:>10.1f} "
+              f"{greedy_time / grid_time:>7.1f}x {len(greedy_groups):>14} {len(grid_groups):>12}")
+
+    # Determinism: shuffling the steps must not change the grouping
+    lats, lngs = synthetic_routes(args.routes, args.steps)
+    permutation = np.random.default_rng(0).permutation(len(lats))
+    original = {frozenset(m.tolist()) for m in group_points(lats, lngs)}
+    shuffled = {
+        frozenset(permutation[m].tolist())
+        for m in group_points(np.array(lats)[permutation], np.array(lngs)[permutation])
+    }
+    print(f"\nGroups identical after shuffling steps: {original == shuffled}")
+
+
+if __name__ == "__main__":
+    main()